@@ -30,6 +30,21 @@ SYMBOL = {
     "北交點": "☊", "南交點": "☋"
 }
 
+# 相位表：(名稱, 角度, 容許度, 是否為主要相位)；順序即排序優先序
+ASPECTS = [
+    ("合相", 0.0, 8.0, True),
+    ("三合", 120.0, 7.0, True),
+    ("六合", 60.0, 4.0, True),
+    ("刑", 90.0, 6.0, True),
+    ("對沖", 180.0, 8.0, True),
+    ("梅花", 150.0, 3.0, False),
+    ("半六合", 30.0, 2.0, False),
+    ("半刑", 45.0, 2.0, False),
+    ("補半刑", 135.0, 2.0, False),
+    ("五分", 72.0, 2.0, False),
+    ("倍五分", 144.0, 2.0, False),
+]
+
 SCORES = [15, 10, 16, 4, 13, 2, 6, 4, 5, 5, 6, 4, 4, 3, 1, 1, 1]
 
 ITEM_ORDER = [
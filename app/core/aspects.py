@@ -0,0 +1,141 @@
+import os
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..constants import ASPECTS, PLANET_KEY
+
+logger = logging.getLogger(__name__)
+
+AspectSpec = Tuple[str, float, float, bool]  # (名稱, 角度, 容許度, 是否為主要相位)
+
+PLANET_POINTS = list(PLANET_KEY)
+NODE_POINTS = ["北交點", "南交點"]
+ANGLE_POINTS = ["上升", "天頂"]
+# 永遠精準對沖的組合，不列入相位表
+_SKIP_PAIRS = {("北交點", "南交點"), ("南交點", "北交點")}
+
+
+def parse_orbs(text: str) -> Dict[str, float]:
+    """'合相:10,三合:6' → {'合相': 10.0, '三合': 6.0}；格式錯誤的項目略過。"""
+    orbs: Dict[str, float] = {}
+    for item in (text or "").replace("，", ",").split(","):
+        name, _, value = item.partition(":")
+        try:
+            orbs[name.strip()] = float(value)
+        except ValueError:
+            if item.strip():
+                logger.warning(f"Ignoring malformed aspect orb '{item.strip()}'")
+    return orbs
+
+
+def aspect_config_from_env() -> Tuple[List[str], List[AspectSpec]]:
+    """
+    依環境變數決定參與比較的點與相位表：
+    ASPECT_POINTS 可加入 nodes / angles，ASPECT_MINOR=1 加入次要相位，ASPECT_ORBS 覆寫容許度。
+    """
+    extra = {x.strip().lower() for x in os.getenv("ASPECT_POINTS", "").split(",") if x.strip()}
+    points = list(PLANET_POINTS)
+    if "nodes" in extra:
+        points += NODE_POINTS
+    if "angles" in extra:
+        points += ANGLE_POINTS
+
+    minor = os.getenv("ASPECT_MINOR", "0").strip().lower() in ("1", "true", "yes")
+    orbs = parse_orbs(os.getenv("ASPECT_ORBS", ""))
+    aspects = [
+        (name, angle, orbs.get(name, orb), major)
+        for name, angle, orb, major in ASPECTS
+        if major or minor
+    ]
+    return points, aspects
+
+
+# 匯入時解析一次，格式錯誤的警告只記錄一次；各端點直接使用
+ASPECT_CONFIG = aspect_config_from_env()
+
+
+def point_lons(data: dict, points: Sequence[str]) -> np.ndarray:
+    """從 calc_chart 結果取出各點黃經，形狀 (N,)。"""
+    extra = {
+        "北交點": data["north_node"],
+        "南交點": data["south_node"],
+        "上升": data["asc"],
+        "天頂": data["mc"],
+    }
+    return np.array(
+        [data["planet_lons"][p] if p in data["planet_lons"] else extra[p] for p in points],
+        dtype=np.float64,
+    )
+
+
+def separation_matrix(lons: np.ndarray) -> np.ndarray:
+    """(K, N) 黃經 → (K, N, N) 兩兩最短角距（0–180°）。"""
+    lons = np.asarray(lons, dtype=np.float64) % 360.0
+    d = np.abs(lons[:, :, None] - lons[:, None, :])
+    return np.where(d <= 180.0, d, 360.0 - d)
+
+
+def match_aspects(sep: np.ndarray, aspects: Sequence[AspectSpec]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    角距陣列（任意形狀 S）對照相位表，回傳 (kind, dev)，形狀皆為 S。
+    kind 為相位表索引（不成相位為 -1），容許度重疊時取偏離最小者；dev 為與該相位的偏離角度。
+    """
+    angles = np.array([a[1] for a in aspects], dtype=np.float64)
+    orbs = np.array([a[2] for a in aspects], dtype=np.float64)
+    dev = np.abs(sep[..., None] - angles)
+    masked = np.where(dev <= orbs, dev, np.inf)
+    kind = np.argmin(masked, axis=-1)
+    best = np.take_along_axis(masked, kind[..., None], axis=-1)[..., 0]
+    hit = np.isfinite(best)
+    return np.where(hit, kind, -1), np.where(hit, best, np.nan)
+
+
+def aspects_stack(
+    lons: np.ndarray,
+    points: Sequence[str],
+    aspects: Sequence[AspectSpec],
+) -> List[List[dict]]:
+    """
+    K 張星盤一次計算：lons 形狀 (K, N)，對應 points 順序。
+    回傳每張盤的相位列，依相位表順序、偏離角度排序。
+    """
+    lons = np.atleast_2d(lons)
+    i, j = np.triu_indices(len(points), k=1)
+    keep = np.array([(points[a], points[b]) not in _SKIP_PAIRS for a, b in zip(i, j)], dtype=bool)
+    i, j = i[keep], j[keep]
+    sep = separation_matrix(lons)[:, i, j]  # (K, P)
+    kind, dev = match_aspects(sep, aspects)
+
+    out: List[List[dict]] = []
+    for k in range(lons.shape[0]):
+        hits = np.nonzero(kind[k] >= 0)[0]
+        devs = np.round(dev[k, hits], 2)
+        order = np.lexsort((devs, kind[k, hits]))
+        out.append([
+            {
+                "組合": f"{points[i[hits[o]]]}-{points[j[hits[o]]]}",
+                "類型": aspects[kind[k, hits[o]]][0],
+                "偏離角度": float(devs[o]),
+            }
+            for o in order
+        ])
+    return out
+
+
+def compute_aspects(
+    data: dict,
+    points: Optional[Sequence[str]] = None,
+    aspects: Optional[Sequence[AspectSpec]] = None,
+) -> List[dict]:
+    """單張星盤的相位列；points / aspects 未指定時依環境變數設定（ASPECT_CONFIG）。"""
+    if points is None or aspects is None:
+        env_points, env_aspects = ASPECT_CONFIG
+        points = env_points if points is None else points
+        aspects = env_aspects if aspects is None else aspects
+    return aspects_stack(point_lons(data, points)[None, :], points, aspects)[0]
+
+
+def major_kinds(aspects: Optional[Sequence[AspectSpec]] = None) -> List[str]:
+    return [a[0] for a in (aspects or ASPECTS) if a[3]]
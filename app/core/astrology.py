@@ -1,10 +1,16 @@
+import os
 import math
+import logging
+import numpy as np
 import swisseph as swe
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 from ..constants import (
     ZODIAC_CN, PLANET_KEY, HOUSE_SYSTEMS_CN2CODE, 
     HOUSE_SYSTEMS_CODE2CN, deg_to_sign, wrap360
 )
+from .ephemeris import table_positions
+
+logger = logging.getLogger(__name__)
 
 def resolve_hsys(house_system: str) -> bytes:
     """接受中文名稱或單字母代碼。預設整宮制。"""
@@ -16,78 +22,196 @@ def resolve_hsys(house_system: str) -> bytes:
     code = s.upper().encode("ascii")[:1]
     return code if code in HOUSE_SYSTEMS_CODE2CN else HOUSE_SYSTEMS_CN2CODE["整宮制"]
 
-def calc_chart(jd_ut: float, lat: float, lon: float, HSYS: bytes):
-    # 宮首與關鍵點
-    cusps, ascmc = swe.houses(jd_ut, lat, lon, HSYS)
-    asc_deg, mc_deg, armc = ascmc[0], ascmc[1], ascmc[2]
+HousePosFn = Callable[[float, float, float, bytes, float, float], float]
+
+def _resolve_house_pos() -> Optional[Tuple[str, HousePosFn]]:
+    """
+    啟動時偵測一次 swe.house_pos 的呼叫方式（不同版本 pyswisseph 參數不同）。
+    回傳 (名稱, fn)，fn(armc, geolat, eps, hsys, lon, lat) -> 1 起算的宮位值；都不相容時回傳 None。
+    """
+    candidates: List[Tuple[str, HousePosFn]] = [
+        ("objcoord", lambda armc, geolat, eps, hsys, x, y: swe.house_pos(armc, geolat, eps, (x, y), hsys)),
+        ("legacy_lat", lambda armc, geolat, eps, hsys, x, y: swe.house_pos(armc, geolat, hsys, x, y)),
+        ("legacy", lambda armc, geolat, eps, hsys, x, y: swe.house_pos(armc, geolat, hsys, x)),
+        ("legacy_eps", lambda armc, geolat, eps, hsys, x, y: swe.house_pos(armc, geolat, eps, hsys, x, y, 1.0)),
+    ]
+    for name, fn in candidates:
+        try:
+            hpos = float(fn(0.0, 0.0, 23.4392911, b"P", 10.0, 0.0))
+        except (TypeError, ValueError, swe.Error):
+            continue
+        if 1.0 <= hpos < 13.0:
+            return name, fn
+    return None
+
+_HOUSE_POS = _resolve_house_pos()
+# cusps：依宮首經度分宮（預設，與過去的行為一致）；swe：使用 swe.house_pos，會考慮黃緯
+HOUSE_POS_METHOD = os.getenv("HOUSE_POS_METHOD", "cusps").strip().lower()
+if HOUSE_POS_METHOD == "swe" and _HOUSE_POS is None:
+    logger.warning("swe.house_pos signature not recognized; falling back to cusp-based houses.")
+    HOUSE_POS_METHOD = "cusps"
+
+def _house_by_cusps(cusps: Sequence[float], xlon: float) -> int:
+    x = wrap360(xlon)
+    for i in range(12):
+        s = wrap360(cusps[i])
+        e = wrap360(cusps[(i + 1) % 12])
+        if e <= s:
+            e += 360.0
+        xx = x if x >= s else x + 360.0
+        if s <= xx < e:
+            return i + 1
+    return 12
+
+def assign_houses(cusps: Sequence[float], lons) -> np.ndarray:
+    """
+    一次把多個黃經分配到宮位（1–12）。宮首以第 1 宮為起點展開成遞增序列後，
+    對所有點做一次 searchsorted（即 bisect）。lons 可為任意形狀的陣列。
+    """
+    c = np.asarray(cusps, dtype=np.float64)
+    base = c[0] % 360.0
+    unwrapped = (c % 360.0 - base) % 360.0
+    x = (np.asarray(lons, dtype=np.float64) % 360.0 - base) % 360.0
+    if np.any(np.diff(unwrapped) < 0.0):
+        # 宮首不呈遞增（極區退化情況）時逐點比對
+        return np.vectorize(lambda v: _house_by_cusps(c, v + base), otypes=[np.int64])(x)
+    return np.searchsorted(unwrapped, x, side="right")
+
+# 宮首只由上升點決定的宮位制，不需 swe.houses
+FAST_HSYS = (b"W", b"E")
+
+def asc_mc_from_armc(armc, lat, eps):
+    """
+    由 ARMC、地理緯度與黃赤交角解析計算上升與天頂黃經；參數可為純量或 NumPy 陣列。
+    極圈內依 Swiss Ephemeris 的慣例，上升點若落在天頂西側則取對沖點。
+    """
+    r = np.radians(armc)
+    e = np.radians(eps)
+    f = np.radians(lat)
+    mc = np.degrees(np.arctan2(np.sin(r), np.cos(r) * np.cos(e))) % 360.0
+    asc = np.degrees(np.arctan2(np.cos(r), -(np.sin(r) * np.cos(e) + np.tan(f) * np.sin(e)))) % 360.0
+    west = ((asc - mc + 180.0) % 360.0 - 180.0) < 0.0
+    polar = np.abs(lat) >= 90.0 - np.asarray(eps)
+    asc = np.where(polar & west, (asc + 180.0) % 360.0, asc)
+    return asc, mc
+
+def calc_angles(jd_ut: float, lat: float, lon: float) -> Tuple[float, float, float, float]:
+    """回傳 (asc, mc, armc, eps)，與 swe.houses 的 ascmc 結果一致。"""
+    eps = swe.calc_ut(jd_ut, swe.ECL_NUT)[0][0]
+    armc = wrap360(swe.sidtime(jd_ut) * 15.0 + lon)
+    # 單張星盤用 math 計算，避免 NumPy 純量運算的額外開銷；公式同 asc_mc_from_armc
+    r, e, f = math.radians(armc), math.radians(eps), math.radians(lat)
+    mc = math.degrees(math.atan2(math.sin(r), math.cos(r) * math.cos(e))) % 360.0
+    asc = math.degrees(math.atan2(math.cos(r), -(math.sin(r) * math.cos(e) + math.tan(f) * math.sin(e)))) % 360.0
+    if abs(lat) >= 90.0 - eps and ((asc - mc + 180.0) % 360.0 - 180.0) < 0.0:
+        asc = (asc + 180.0) % 360.0
+    return asc, mc, armc, eps
+
+def fast_cusps(asc: float, HSYS: bytes) -> List[float]:
+    if HSYS == b"W":
+        start = math.floor(asc / 30.0) * 30.0
+        return [wrap360(start + 30.0 * i) for i in range(12)]
+    return [wrap360(asc + 30.0 * i) for i in range(12)]
 
-    # 行星經緯與距離
+def fast_houses(asc: float, lons: Sequence[float], HSYS: bytes) -> List[int]:
+    """整宮制以星座序號相減、等宮制以距上升點的 30° 區段直接求宮位。"""
+    if HSYS == b"W":
+        asc_idx = int(math.floor(wrap360(asc) / 30.0))
+        return [(int(math.floor(wrap360(x) / 30.0)) - asc_idx) % 12 + 1 for x in lons]
+    return [min(12, int(math.floor(wrap360(x - asc) / 30.0)) + 1) for x in lons]
+
+def calc_points(jd_ut: float) -> dict:
+    """與宮位制無關的部分：行星黃經緯與交點。有設定星曆表時，表格範圍內的行星以插值取得。"""
+    tabled = table_positions(jd_ut)
     planet_lons: Dict[str, float] = {}
     planet_lats: Dict[str, float] = {}
-    planet_dists: Dict[str, float] = {}
     for name, pid in PLANET_KEY.items():
+        if name in tabled:
+            planet_lons[name], planet_lats[name] = tabled[name]
+            continue
         xx, _ = swe.calc_ut(jd_ut, pid)  # xx[0]=lon, xx[1]=lat, xx[2]=dist
         planet_lons[name] = wrap360(xx[0])
         planet_lats[name] = xx[1]
-        planet_dists[name] = xx[2] if len(xx) > 2 else 1.0
 
-    # 交點
     north_node = wrap360(swe.calc_ut(jd_ut, swe.MEAN_NODE)[0][0])
-    south_node = wrap360(north_node + 180.0)
-
-    def house_by_cusps(xlon: float) -> int:
-        x = wrap360(xlon)
-        for i in range(12):
-            s = wrap360(cusps[i])
-            e = wrap360(cusps[(i + 1) % 12])
-            if e <= s:
-                e += 360.0
-            xx = x if x >= s else x + 360.0
-            if s <= xx < e:
-                return i + 1
-        return 12
-
-    def house_pos_compat(xlon: float, xlat: float = 0.0, xdist: float = 1.0) -> int:
-        try:
-            hpos = swe.house_pos(armc, lat, HSYS, xlon, xlat)
-        except TypeError:
-            try:
-                hpos = swe.house_pos(armc, lat, HSYS, xlon)
-            except TypeError:
-                try:
-                    eps = swe.calc_ut(jd_ut, swe.ECL_NUT)[0][0]
-                except Exception:
-                    eps = 23.4392911
-                try:
-                    hpos = swe.house_pos(armc, lat, eps, HSYS, xlon, xlat, xdist)
-                except TypeError:
-                    return house_by_cusps(xlon)
-        return ((int(math.floor(hpos)) % 12) + 1)
+    return {
+        "planet_lons": planet_lons,
+        "planet_lats": planet_lats,
+        "north_node": north_node,
+        "south_node": wrap360(north_node + 180.0),
+        "planet_signs": {
+            **{p: deg_to_sign(v) for p, v in planet_lons.items()},
+            "北交點": deg_to_sign(north_node),
+            "南交點": deg_to_sign(north_node + 180.0),
+        },
+    }
+
+def _chart_for_system(
+    points: dict, jd_ut: float, lat: float, HSYS: bytes, fast: bool,
+    cusps: Sequence[float], asc_deg: float, mc_deg: float, armc: float, eps: Optional[float],
+) -> dict:
+    planet_lons = points["planet_lons"]
+    north_node, south_node = points["north_node"], points["south_node"]
 
     # 各點宮位
-    planet_houses: Dict[str, int] = {}
-    for pname in planet_lons:
-        planet_houses[pname] = house_pos_compat(planet_lons[pname], planet_lats[pname], planet_dists[pname])
-    planet_houses["北交點"] = house_pos_compat(north_node)
-    planet_houses["南交點"] = house_pos_compat(south_node)
-    planet_houses["天頂"] = house_pos_compat(mc_deg)
-
-    # 星座
-    planet_signs = {p: deg_to_sign(planet_lons[p]) for p in planet_lons}
-    planet_signs["北交點"] = deg_to_sign(north_node)
-    planet_signs["南交點"] = deg_to_sign(south_node)
-    asc_sign = deg_to_sign(asc_deg)
-    mc_sign = deg_to_sign(mc_deg)
+    names = list(planet_lons) + ["北交點", "南交點", "天頂"]
+    lons = list(planet_lons.values()) + [north_node, south_node, mc_deg]
+    if HOUSE_POS_METHOD == "swe":
+        if eps is None:
+            eps = swe.calc_ut(jd_ut, swe.ECL_NUT)[0][0]
+        lats = list(points["planet_lats"].values()) + [0.0, 0.0, 0.0]
+        fn = _HOUSE_POS[1]
+        houses = [min(12, max(1, int(fn(armc, lat, eps, HSYS, x, y)))) for x, y in zip(lons, lats)]
+    elif fast and HSYS in FAST_HSYS:
+        houses = fast_houses(asc_deg, lons, HSYS)
+    else:
+        houses = assign_houses(cusps, lons).tolist()
+    planet_houses: Dict[str, int] = dict(zip(names, houses))
 
     return {
         "asc": asc_deg,
         "mc": mc_deg,
-        "asc_sign": asc_sign,
-        "mc_sign": mc_sign,
+        "asc_sign": deg_to_sign(asc_deg),
+        "mc_sign": deg_to_sign(mc_deg),
         "cusps": [wrap360(c) for c in cusps],
         "planet_lons": planet_lons,
-        "planet_signs": planet_signs,
+        "planet_signs": points["planet_signs"],
         "planet_houses": planet_houses,
         "north_node": north_node,
         "south_node": south_node,
     }
+
+def calc_chart_multi(
+    jd_ut: float, lat: float, lon: float, systems: Sequence[bytes], fast: bool = True,
+    points: Optional[dict] = None,
+) -> List[dict]:
+    """
+    一次計算多個宮位制：行星、交點、ARMC 與黃赤交角只算一次，
+    每個宮位制只另外求宮首與各點宮位。回傳與 systems 同順序的 calc_chart 結果。
+    回傳的各張星盤共用 planet_lons / planet_signs 物件，呼叫端不可修改。
+    points 可傳入已算好的 calc_points 結果（需要黃緯時避免重算）。
+    """
+    points = points or calc_points(jd_ut)
+    angles = None
+    if fast and (len(systems) > 1 or any(h in FAST_HSYS for h in systems)):
+        angles = calc_angles(jd_ut, lat, lon)
+
+    charts = []
+    for HSYS in systems:
+        if angles is None:
+            cusps, ascmc = swe.houses(jd_ut, lat, lon, HSYS)
+            asc_deg, mc_deg, armc, eps = ascmc[0], ascmc[1], ascmc[2], None
+        elif HSYS in FAST_HSYS:
+            asc_deg, mc_deg, armc, eps = angles
+            cusps = fast_cusps(asc_deg, HSYS)
+        else:
+            armc, eps = angles[2], angles[3]
+            cusps, ascmc = swe.houses_armc(armc, lat, eps, HSYS)
+            asc_deg, mc_deg = ascmc[0], ascmc[1]
+        charts.append(_chart_for_system(
+            points, jd_ut, lat, HSYS, fast, cusps, asc_deg, mc_deg, armc, eps
+        ))
+    return charts
+
+def calc_chart(jd_ut: float, lat: float, lon: float, HSYS: bytes, fast: bool = True):
+    return calc_chart_multi(jd_ut, lat, lon, [HSYS], fast=fast)[0]
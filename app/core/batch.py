@@ -0,0 +1,102 @@
+import os
+import atexit
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import swisseph as swe
+
+from .chart import NBYTES, Chart
+
+logger = logging.getLogger(__name__)
+
+ChartTask = Tuple[float, float, float, bytes]  # (jd_ut, lat, lon, HSYS)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def default_workers() -> int:
+    try:
+        n = int(os.getenv("BATCH_WORKERS", "0"))
+    except ValueError:
+        n = 0
+    return n if n > 0 else (os.cpu_count() or 1)
+
+
+def _init_worker(ephe_path: Optional[str]) -> None:
+    # 每個工作行程只設定一次星曆路徑
+    if ephe_path:
+        swe.set_ephe_path(ephe_path)
+
+
+def _calc_chunk(tasks: List[ChartTask]) -> bytes:
+    """在工作行程中計算一批星盤，以 Chart 二進位格式串接回傳，跨行程只傳一段 bytes。"""
+    return b"".join(Chart.compute(*t).to_bytes() for t in tasks)
+
+
+def split_charts(blob: bytes) -> List[Chart]:
+    """把 _calc_chunk 的結果切回 Chart；各 Chart 直接引用 blob，不複製。"""
+    return [Chart.from_buffer(blob, off) for off in range(0, len(blob), NBYTES)]
+
+
+def expand_compact(chart: Chart) -> dict:
+    """把精簡結果還原成與 calc_chart 相同的 dict。"""
+    return chart.to_dict()
+
+
+def get_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """共用的行程池；以 spawn 啟動，避免在多執行緒的伺服器行程中 fork。"""
+    global _pool, _pool_workers
+    workers = workers or default_workers()
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(os.getenv("SWEPH_PATH"),),
+            )
+            _pool_workers = workers
+            logger.info(f"Batch chart pool started with {workers} workers.")
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(shutdown_pool)
+
+
+def calc_charts_batch(
+    tasks: Sequence[ChartTask],
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    compact: bool = False,
+) -> List:
+    """
+    批次計算多張星盤，依輸入順序回傳。workers > 1 時分散到行程池，
+    每個工作行程一次處理 chunksize 張以攤平 IPC 成本。compact=True 時回傳 Chart。
+    """
+    tasks = [(float(jd), float(lat), float(lon), hsys) for jd, lat, lon, hsys in tasks]
+    workers = workers or default_workers()
+    if workers <= 1 or len(tasks) < 2:
+        results = [Chart.compute(*t) for t in tasks]
+    else:
+        if not chunksize:
+            chunksize = max(1, min(512, len(tasks) // (workers * 4) or 1))
+        chunks = [tasks[i:i + chunksize] for i in range(0, len(tasks), chunksize)]
+        results = []
+        for blob in get_pool(workers).map(_calc_chunk, chunks):
+            results.extend(split_charts(blob))
+    return results if compact else [expand_compact(r) for r in results]
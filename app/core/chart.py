@@ -0,0 +1,113 @@
+import struct
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+from ..constants import PLANET_KEY, deg_to_sign, wrap360
+from ..utils.formatters import build_chart_tables
+from .astrology import calc_chart_multi, calc_points
+
+# 固定順序：陣列欄位依此排列，不再以中文鍵逐一查找
+PLANETS = list(PLANET_KEY)
+LON_POINTS = PLANETS + ["北交點"]  # 南交點由北交點導出
+HOUSE_POINTS = PLANETS + ["北交點", "南交點", "天頂"]  # 與 calc_chart 的 planet_houses 順序相同
+
+# 二進位格式：8 位元組檔頭（魔數、版本、宮位制代碼）＋ float64 值 ＋ int8 宮位，皆為小端序
+MAGIC = b"CH"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<2sBc4x")
+_SCALARS = ("jd_ut", "lat", "lon", "asc", "mc")
+_LONS = slice(len(_SCALARS), len(_SCALARS) + len(LON_POINTS))
+_LATS = slice(_LONS.stop, _LONS.stop + len(LON_POINTS))
+_CUSPS = slice(_LATS.stop, _LATS.stop + 12)
+N_VALUES = _CUSPS.stop
+NBYTES = _HEADER.size + N_VALUES * 8 + len(HOUSE_POINTS)
+
+
+class Chart:
+    """
+    陣列式的單張星盤：values 為 float64 (N_VALUES,)，依 _SCALARS、黃經、黃緯、宮首排列；
+    houses 為 int8，依 HOUSE_POINTS 排列。lons / lats / cusps 都是 values 的切片（不複製）。
+    以 from_buffer 還原時直接引用原緩衝區，為唯讀。
+    """
+    __slots__ = ("hsys", "values", "houses")
+
+    def __init__(self, hsys: bytes, values: np.ndarray, houses: np.ndarray):
+        self.hsys = hsys
+        self.values = values
+        self.houses = houses
+
+    jd_ut = property(lambda self: float(self.values[0]))
+    lat = property(lambda self: float(self.values[1]))
+    lon = property(lambda self: float(self.values[2]))
+    asc = property(lambda self: float(self.values[3]))
+    mc = property(lambda self: float(self.values[4]))
+    lons = property(lambda self: self.values[_LONS])
+    lats = property(lambda self: self.values[_LATS])
+    cusps = property(lambda self: self.values[_CUSPS])
+
+    @classmethod
+    def from_chart(
+        cls, data: dict, jd_ut: float, lat: float, lon: float, HSYS: bytes,
+        planet_lats: Optional[Dict[str, float]] = None,
+    ) -> "Chart":
+        """由 calc_chart 的 dict 建立；calc_chart 不含黃緯，未提供 planet_lats 時記為 0。"""
+        values = np.zeros(N_VALUES, dtype=np.float64)
+        values[:len(_SCALARS)] = (jd_ut, lat, lon, data["asc"], data["mc"])
+        values[_LONS] = [data["planet_lons"][p] for p in PLANETS] + [data["north_node"]]
+        if planet_lats:
+            values[_LATS.start:_LATS.start + len(PLANETS)] = [planet_lats[p] for p in PLANETS]
+        values[_CUSPS] = data["cusps"]
+        houses = np.array([data["planet_houses"][p] for p in HOUSE_POINTS], dtype=np.int8)
+        return cls(HSYS, values, houses)
+
+    @classmethod
+    def compute(cls, jd_ut: float, lat: float, lon: float, HSYS: bytes) -> "Chart":
+        points = calc_points(jd_ut)
+        data = calc_chart_multi(jd_ut, lat, lon, [HSYS], points=points)[0]
+        return cls.from_chart(data, jd_ut, lat, lon, HSYS, points["planet_lats"])
+
+    def to_bytes(self) -> bytes:
+        return (
+            _HEADER.pack(MAGIC, FORMAT_VERSION, self.hsys)
+            + self.values.astype("<f8", copy=False).tobytes()
+            + self.houses.tobytes()
+        )
+
+    @classmethod
+    def from_buffer(cls, buf: Union[bytes, bytearray, memoryview], offset: int = 0) -> "Chart":
+        """不複製資料：values / houses 為 buf 上的 NumPy 檢視，buf 須在 Chart 使用期間保持存在。"""
+        magic, version, hsys = _HEADER.unpack_from(buf, offset)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("星盤二進位格式不符")
+        start = offset + _HEADER.size
+        values = np.frombuffer(buf, dtype="<f8", count=N_VALUES, offset=start)
+        houses = np.frombuffer(buf, dtype=np.int8, count=len(HOUSE_POINTS), offset=start + N_VALUES * 8)
+        return cls(hsys, values, houses)
+
+    def to_dict(self) -> dict:
+        """還原成與 calc_chart 相同的 dict（鍵、順序與數值皆一致）。"""
+        lons = self.lons.tolist()
+        planet_lons = dict(zip(PLANETS, lons[:len(PLANETS)]))
+        north_node = lons[-1]
+        south_node = wrap360(north_node + 180.0)
+        planet_signs = {p: deg_to_sign(v) for p, v in planet_lons.items()}
+        planet_signs["北交點"] = deg_to_sign(north_node)
+        planet_signs["南交點"] = deg_to_sign(north_node + 180.0)
+        return {
+            "asc": self.asc,
+            "mc": self.mc,
+            "asc_sign": deg_to_sign(self.asc),
+            "mc_sign": deg_to_sign(self.mc),
+            "cusps": self.cusps.tolist(),
+            "planet_lons": planet_lons,
+            "planet_signs": planet_signs,
+            "planet_houses": dict(zip(HOUSE_POINTS, self.houses.tolist())),
+            "north_node": north_node,
+            "south_node": south_node,
+        }
+
+    def to_payload(self) -> dict:
+        """前端 /api/chart 的星盤欄位：calc_chart 的 dict 加上 build_chart_tables 的各表格。"""
+        data = self.to_dict()
+        return {**data, **build_chart_tables(data)}
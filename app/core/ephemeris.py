@@ -0,0 +1,243 @@
+import os
+import json
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import swisseph as swe
+
+from ..constants import PLANET_KEY
+
+logger = logging.getLogger(__name__)
+
+TABLE_VERSION = 1
+# 月亮一天移動約 13°，以日為步長的插值誤差過大，一律改用 Swiss Ephemeris
+TABLE_BODIES = [n for n in PLANET_KEY if n != "月亮"]
+_FIELDS = 4  # lon, lat, lon_speed, lat_speed
+
+
+def _wrap180(x):
+    return (x + 180.0) % 360.0 - 180.0
+
+
+def swe_state(jd_ut: float, pid: int) -> Tuple[float, float, float, float]:
+    xx, _ = swe.calc_ut(jd_ut, pid, swe.FLG_SWIEPH | swe.FLG_SPEED)
+    return xx[0], xx[1], xx[3], xx[4]
+
+
+class EphemerisTable:
+    """
+    以記憶體映射方式讀取的預先計算星曆表（build_ephemeris.py 產生）。
+    每個步長節點存放 (黃經, 黃緯, 黃經速度, 黃緯速度)，以三次 Hermite 插值求任意時刻位置。
+    np.load(mmap_mode="r") 只映射檔案，多個工作行程共用同一份作業系統頁快取。
+    """
+    def __init__(self, path: str):
+        meta_path = os.path.splitext(path)[0] + ".json"
+        with open(meta_path, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != TABLE_VERSION:
+            raise ValueError(f"Unsupported ephemeris table version {self.meta.get('version')}")
+        self.path = path
+        self.data = np.load(path, mmap_mode="r")
+        self.start = float(self.meta["start_jd"])
+        self.step = float(self.meta["step"])
+        self.bodies: List[str] = list(self.meta["bodies"])
+        self.index = {b: i for i, b in enumerate(self.bodies)}
+        self.max_error: Dict[str, float] = dict(self.meta["max_error_deg"])
+        self.end = self.start + self.step * (self.data.shape[0] - 1)
+        # 分段誤差上限 (S, B)；舊表沒有分段資料時整張表視為一段
+        self.segment_steps = int(self.meta.get("segment_steps") or self.data.shape[0])
+        segments = self.meta.get("segment_error_deg") or {b: [e] for b, e in self.max_error.items()}
+        self.segment_error = np.array(
+            [segments.get(b, [np.inf]) for b in self.bodies], dtype=np.float64
+        ).T
+
+    def covers(self, jd_ut: float) -> bool:
+        return self.start <= jd_ut <= self.end
+
+    def _interval(self, jds: np.ndarray) -> np.ndarray:
+        u = (jds - self.start) / self.step
+        return np.clip(np.floor(u).astype(np.int64), 0, self.data.shape[0] - 2)
+
+    def usable(self, jds, tolerance: float, bodies: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        (K, B) 布林陣列：各時刻所在區段（約一年）建表時量測的誤差上限（含安全係數）是否不超過 tolerance 度。
+        單一區段誤差偏大只影響該區段，不會讓整個天體改用 Swiss Ephemeris。
+        """
+        jds = np.atleast_1d(np.asarray(jds, dtype=np.float64))
+        cols = [self.index[b] for b in (bodies or self.bodies)]
+        seg = np.minimum(self._interval(jds) // self.segment_steps, self.segment_error.shape[0] - 1)
+        return self.segment_error[seg][:, cols] <= tolerance
+
+    def interpolate(self, jds, bodies: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        向量化插值。jds 形狀 (K,)，回傳 (lon, lat, lon_speed) 三個 (K, B) 陣列，
+        lon 已正規化到 [0, 360)。jds 須落在表格範圍內。
+        """
+        jds = np.atleast_1d(np.asarray(jds, dtype=np.float64))
+        cols = [self.index[b] for b in (bodies or self.bodies)]
+        i0 = self._interval(jds)
+        t = ((jds - self.start) / self.step - i0)[:, None]
+        a = self.data[i0][:, cols]
+        b = self.data[i0 + 1][:, cols]
+        h = self.step
+
+        h00 = 2 * t ** 3 - 3 * t ** 2 + 1
+        h10 = t ** 3 - 2 * t ** 2 + t
+        h01 = -2 * t ** 3 + 3 * t ** 2
+        h11 = t ** 3 - t ** 2
+        d00 = (6 * t ** 2 - 6 * t) / h
+        d10 = 3 * t ** 2 - 4 * t + 1
+        d01 = (-6 * t ** 2 + 6 * t) / h
+        d11 = 3 * t ** 2 - 2 * t
+
+        lon0 = a[..., 0]
+        lon1 = lon0 + _wrap180(b[..., 0] - lon0)
+        lon = h00 * lon0 + h10 * h * a[..., 2] + h01 * lon1 + h11 * h * b[..., 2]
+        lat = h00 * a[..., 1] + h10 * h * a[..., 3] + h01 * b[..., 1] + h11 * h * b[..., 3]
+        speed = d00 * lon0 + d10 * a[..., 2] + d01 * lon1 + d11 * b[..., 2]
+        return lon % 360.0, lat, speed
+
+
+def build_table(
+    path: str, start_jd: float, end_jd: float, step: float = 1.0, safety: float = 2.0,
+    segment_days: float = 365.25,
+) -> dict:
+    """
+    以 Swiss Ephemeris 計算每個節點的位置與速度並寫入 .npy，再於每個區間的
+    1/4、1/2、3/4 處與 Swiss Ephemeris 比較。誤差上限（最大誤差 × safety）依每 segment_days
+    一段分別記錄，查詢時只有落在超標區段的時刻改用 Swiss Ephemeris；max_error_deg 為各段的最大值。
+    """
+    n = int(np.ceil((end_jd - start_jd) / step)) + 1
+    segment_steps = max(1, int(round(segment_days / step)))
+    jds = start_jd + step * np.arange(n)
+    data = np.empty((n, len(TABLE_BODIES), _FIELDS), dtype=np.float64)
+    for k, jd in enumerate(jds):
+        for j, name in enumerate(TABLE_BODIES):
+            data[k, j] = swe_state(float(jd), PLANET_KEY[name])
+
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = path + ".tmp.npy"
+    np.save(tmp, data)
+    os.replace(tmp, path)
+
+    meta = {
+        "version": TABLE_VERSION,
+        "start_jd": float(start_jd),
+        "step": float(step),
+        "bodies": TABLE_BODIES,
+        "swe_version": swe.version,
+        "max_error_deg": {b: float("inf") for b in TABLE_BODIES},
+        "segment_steps": segment_steps,
+        "segment_error_deg": {},
+    }
+    meta_path = os.path.splitext(path)[0] + ".json"
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    table = EphemerisTable(path)
+    offsets = np.array([0.25, 0.5, 0.75])
+    probe = (jds[:-1, None] + step * offsets).ravel()
+    lon, lat, _ = table.interpolate(probe)
+    seg_starts = np.arange(0, n - 1, segment_steps)
+    for j, name in enumerate(TABLE_BODIES):
+        ref = np.array([swe_state(float(jd), PLANET_KEY[name])[:2] for jd in probe])
+        err = np.maximum(
+            np.abs(_wrap180(lon[:, j] - ref[:, 0])), np.abs(lat[:, j] - ref[:, 1])
+        ).reshape(n - 1, len(offsets)).max(axis=1)
+        seg = np.maximum.reduceat(err, seg_starts) * safety
+        meta["segment_error_deg"][name] = seg.tolist()
+        meta["max_error_deg"][name] = float(seg.max())
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+_table: Optional[EphemerisTable] = None
+_table_loaded = False
+_table_lock = threading.Lock()
+
+
+def get_ephemeris_table() -> Optional[EphemerisTable]:
+    """EPHEMERIS_TABLE 指定 .npy 路徑時載入（每個行程一次）；未設定或載入失敗時回傳 None。"""
+    global _table, _table_loaded
+    if not _table_loaded:
+        with _table_lock:
+            if not _table_loaded:
+                path = os.getenv("EPHEMERIS_TABLE", "").strip()
+                if path:
+                    try:
+                        _table = EphemerisTable(path)
+                        logger.info(f"Ephemeris table mapped from '{path}' "
+                                    f"(JD {_table.start}–{_table.end}, step {_table.step}).")
+                    except Exception as e:
+                        logger.warning(f"Ephemeris table disabled ({path}): {e}")
+                _table_loaded = True
+    return _table
+
+
+def _tolerance() -> float:
+    # EPHEMERIS_MAX_ERROR 以角秒為單位；星盤顯示到角分，預設 5 角秒
+    try:
+        return float(os.getenv("EPHEMERIS_MAX_ERROR", "5")) / 3600.0
+    except ValueError:
+        return 5.0 / 3600.0
+
+
+def table_positions(jd_ut: float) -> Dict[str, Tuple[float, float]]:
+    """
+    單一時刻可由星曆表提供的天體 {名稱: (黃經, 黃緯)}。
+    超出表格範圍、或該時刻所在區段誤差上限大於 EPHEMERIS_MAX_ERROR（角秒，預設 5）的天體不在結果中，
+    由呼叫端改用 Swiss Ephemeris。
+    """
+    table = get_ephemeris_table()
+    if table is None or not table.covers(jd_ut):
+        return {}
+    ok = table.usable(jd_ut, _tolerance())[0]
+    bodies = [b for b, good in zip(table.bodies, ok) if good]
+    if not bodies:
+        return {}
+    lon, lat, _ = table.interpolate(jd_ut, bodies)
+    return {b: (float(lon[0, i]), float(lat[0, i])) for i, b in enumerate(bodies)}
+
+
+def positions_array(
+    jds, names: Sequence[str], tolerance: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    多個時刻、多個天體的 (黃經, 黃緯, 黃經速度)，各為 (K, N) 陣列。
+    範圍內且所在區段誤差合格的時刻以星曆表一次插值，其餘（含月亮）逐點呼叫 Swiss Ephemeris。
+    tolerance（度）可放寬誤差門檻，供只需粗略位置的取樣使用；預設依 EPHEMERIS_MAX_ERROR。
+    """
+    jds = np.atleast_1d(np.asarray(jds, dtype=np.float64))
+    lon = np.empty((len(jds), len(names)))
+    lat = np.empty_like(lon)
+    speed = np.empty_like(lon)
+
+    table = get_ephemeris_table()
+    # done[k, j]：該時刻、該天體已由星曆表提供
+    done = np.zeros(lon.shape, dtype=bool)
+    if table is not None and len(jds) and table.covers(float(jds.min())) and table.covers(float(jds.max())):
+        tabled = [j for j, n in enumerate(names) if n in table.index]
+        if tabled:
+            tnames = [names[j] for j in tabled]
+            done[:, tabled] = table.usable(jds, _tolerance() if tolerance is None else tolerance, tnames)
+            tabled = [j for j in tabled if done[:, j].any()]
+        if tabled:
+            tl, tb, ts = table.interpolate(jds, [names[j] for j in tabled])
+            lon[:, tabled], lat[:, tabled], speed[:, tabled] = tl, tb, ts
+
+    for j, name in enumerate(names):
+        if done[:, j].all():
+            continue
+        pid = PLANET_KEY.get(name, swe.MEAN_NODE if name == "北交點" else None)
+        if pid is None:
+            raise ValueError(f"Unknown body: {name}")
+        for k in np.nonzero(~done[:, j])[0]:
+            jd = jds[k]
+            lo, la, sp, _ = swe_state(float(jd), pid)
+            lon[k, j], lat[k, j], speed[k, j] = lo % 360.0, la, sp
+    return lon, lat, speed
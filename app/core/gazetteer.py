@@ -0,0 +1,325 @@
+import io
+import os
+import re
+import zipfile
+import logging
+import unicodedata
+import difflib
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ..schemas import GeoOut
+
+logger = logging.getLogger(__name__)
+
+# GeoNames 欄位（geoname table, tab 分隔）
+_COL_NAME, _COL_ASCII, _COL_ALT = 1, 2, 3
+_COL_LAT, _COL_LON = 4, 5
+_COL_CC, _COL_ADMIN1 = 8, 10
+_COL_POP, _COL_TZ = 14, 17
+# 與 GeoNames 主檔放在同一資料夾時一併載入，讓「Springfield, Illinois」「Paris, France」的限定詞可以比對
+ADMIN1_FILE = "admin1CodesASCII.txt"
+COUNTRY_FILE = "countryInfo.txt"
+
+_STRIP_RE = re.compile(r"[\s\-'’.·・,，、()（）]+")
+_CJK_SUFFIXES = ("特別行政區", "特别行政区", "自治區", "自治区", "市", "縣", "县", "區", "区", "省")
+_CJK_VARIANTS = str.maketrans({"臺": "台", "舊": "旧"})
+_LATIN_QUERY_SUFFIXES = ("city",)
+# 前綴比對的最短長度（CJK / 拉丁），太短的輸入（如「Tai」）幾乎一定有歧義
+_PREFIX_MIN_CJK, _PREFIX_MIN_LATIN = 2, 5
+_RANGE_LIMIT = 4096
+
+
+def _is_cjk(ch: str) -> bool:
+    o = ord(ch)
+    return (
+        0x3040 <= o <= 0x30FF      # 平假名、片假名
+        or 0x3400 <= o <= 0x9FFF   # CJK 統一漢字
+        or 0xAC00 <= o <= 0xD7AF   # 韓文
+        or 0xF900 <= o <= 0xFAFF
+    )
+
+
+def name_key(s: str) -> str:
+    """索引與查詢共用的地名鍵：NFKC、不分大小寫、去拉丁字母重音、去空白與標點。"""
+    s = unicodedata.normalize("NFKC", s or "").casefold().translate(_CJK_VARIANTS)
+    if not any(_is_cjk(ch) for ch in s):
+        s = "".join(
+            ch for ch in unicodedata.normalize("NFKD", s) if not unicodedata.combining(ch)
+        )
+    return _STRIP_RE.sub("", s)
+
+
+def _cjk_aliases(key: str) -> Iterator[str]:
+    """中日韓地名另外索引去掉行政區後綴的寫法，例如「台北市」→「台北」。"""
+    if key and _is_cjk(key[0]):
+        for suf in _CJK_SUFFIXES:
+            if key.endswith(suf) and len(key) > len(suf) + 1:
+                yield key[: -len(suf)]
+                break
+
+
+def _query_aliases(key: str) -> Iterator[str]:
+    """查詢端額外嘗試的寫法：中日韓行政區後綴，以及拉丁字母的「City」（Tainan City → Tainan）。"""
+    yield from _cjk_aliases(key)
+    if key and not _is_cjk(key[0]):
+        for suf in _LATIN_QUERY_SUFFIXES:
+            if key.endswith(suf) and len(key) > len(suf) + 2:
+                yield key[: -len(suf)]
+
+
+class _KeyView:
+    """把單一大字串 + 位移陣列包裝成可 bisect 的有序序列。"""
+    __slots__ = ("blob", "offsets")
+
+    def __init__(self, blob: str, offsets: array):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]]
+
+
+class Gazetteer:
+    """
+    本地地名索引（GeoNames 格式 TSV）。
+    地點以平行的 array 儲存；所有名稱與別名排序後串成一個字串，以 bisect 做精確 / 前綴查詢，
+    前綴失敗時再於同首字區段內做模糊比對。
+    region_names 為 {"TW": [...], "US.IL": [...]} 形式的國家 / 一級行政區名稱，用於驗證查詢中的限定詞。
+    """
+    def __init__(
+        self,
+        rows: Iterable[Tuple[str, List[str], float, float, int, str, str, str]],
+        region_names: Optional[Dict[str, Iterable[str]]] = None,
+    ):
+        self.lats = array("d")
+        self.lons = array("d")
+        self.pops = array("q")
+        self.tz_ids = array("H")
+        self.tz_names: List[str] = []
+        tz_index: Dict[str, int] = {}
+        # 國家與一級行政區代碼（"TW"、"US.IL"），region_keys 為各代碼可接受的限定詞鍵
+        self.country_ids = array("H")
+        self.admin_ids = array("I")
+        self.regions: List[str] = []
+        self.region_keys: List[Set[str]] = []
+        region_index: Dict[str, int] = {}
+        region_names = region_names or {}
+
+        def region_id(code: str) -> int:
+            rid = region_index.get(code)
+            if rid is None:
+                rid = region_index[code] = len(self.regions)
+                self.regions.append(code)
+                keys = {name_key(code.rsplit(".", 1)[-1])}
+                keys.update(name_key(n) for n in region_names.get(code, ()))
+                keys.discard("")
+                self.region_keys.append(keys)
+            return rid
+
+        entries: List[Tuple[str, int, int]] = []
+        for name, aliases, lat, lon, pop, tz, cc, admin1 in rows:
+            pid = len(self.lats)
+            self.lats.append(lat)
+            self.lons.append(lon)
+            self.pops.append(pop)
+            if tz not in tz_index:
+                tz_index[tz] = len(self.tz_names)
+                self.tz_names.append(tz)
+            self.tz_ids.append(tz_index[tz])
+            self.country_ids.append(region_id(cc))
+            self.admin_ids.append(region_id(f"{cc}.{admin1}"))
+
+            keys = set()
+            for n in (name, *aliases):
+                k = name_key(n)
+                if k:
+                    keys.add(k)
+                    keys.update(_cjk_aliases(k))
+            for k in keys:
+                entries.append((k, -pop, pid))
+
+        # 同名地點依人口排序，精確查詢取第一筆即為最大者
+        entries.sort()
+        offsets = array("I", [0])
+        ids = array("I")
+        parts: List[str] = []
+        pos = 0
+        for k, _, pid in entries:
+            parts.append(k)
+            pos += len(k)
+            offsets.append(pos)
+            ids.append(pid)
+        self.keys = _KeyView("".join(parts), offsets)
+        self.ids = ids
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    @classmethod
+    def from_file(cls, path: str, min_population: int = 0) -> "Gazetteer":
+        return cls(_read_geonames(path, min_population), _read_region_names(os.path.dirname(path)))
+
+    def _geo(self, pid: int) -> GeoOut:
+        return GeoOut(lat=self.lats[pid], lon=self.lons[pid], tz=self.tz_names[self.tz_ids[pid]])
+
+    def exact_all(self, key: str) -> Iterator[int]:
+        """名稱完全相同的所有地點，人口由多到少。"""
+        i = bisect_left(self.keys, key)
+        while i < len(self.keys) and self.keys[i] == key:
+            yield self.ids[i]
+            i += 1
+
+    def exact(self, key: str) -> Optional[int]:
+        return next(self.exact_all(key), None)
+
+    def prefix(self, key: str) -> Optional[int]:
+        """只有一個地點以 key 開頭時才採用；多個地點（如「Tai」）視為歧義，回傳 None。"""
+        min_len = _PREFIX_MIN_CJK if _is_cjk(key[0]) else _PREFIX_MIN_LATIN
+        if len(key) < min_len:
+            return None
+        lo = bisect_left(self.keys, key)
+        hi = bisect_left(self.keys, key + "\U0010ffff")
+        if hi - lo > _RANGE_LIMIT:
+            return None
+        pids = {self.ids[i] for i in range(lo, hi)}
+        return pids.pop() if len(pids) == 1 else None
+
+    def fuzzy(self, key: str, cutoff: float = 0.8, limit: int = 20000) -> Optional[int]:
+        """相似度達 cutoff 的地點唯一時才採用。"""
+        if len(key) < 4:
+            return None
+        lo = bisect_left(self.keys, key[0])
+        hi = bisect_left(self.keys, key[0] + "\U0010ffff")
+        pids = set()
+        matcher = difflib.SequenceMatcher(b=key, autojunk=False)
+        for i in range(lo, min(hi, lo + limit)):
+            cand = self.keys[i]
+            if abs(len(cand) - len(key)) > 2:
+                continue
+            matcher.set_seq1(cand)
+            if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                continue
+            if matcher.ratio() >= cutoff:
+                pids.add(self.ids[i])
+                if len(pids) > 1:
+                    return None
+        return pids.pop() if pids else None
+
+    def _qualifies(self, pid: int, qualifier: str) -> bool:
+        return (qualifier in self.region_keys[self.country_ids[pid]]
+                or qualifier in self.region_keys[self.admin_ids[pid]])
+
+    def lookup(self, q: str) -> Optional[GeoOut]:
+        """
+        逗號前為地名，其後為州 / 省 / 國家等限定詞。
+        有限定詞時只接受名稱精確相符、且每個限定詞都對得上該地點國家或一級行政區的結果，
+        無法確認就回傳 None 交給下一個後端，不以同名的其他地點頂替。
+        沒有限定詞時先精確比對（同名取人口最多），再前綴、模糊比對（僅限唯一符合）。
+        """
+        parts = [p for p in re.split(r"[,，]", q) if name_key(p)]
+        if not parts:
+            return None
+        head = name_key(parts[0])
+        keys = [head] + [a for a in _query_aliases(head) if a != head]
+        qualifiers = [name_key(p) for p in parts[1:]]
+
+        if qualifiers:
+            full = name_key(q)
+            pid = self.exact(full)  # 名稱本身含逗號，例如「Washington, D.C.」
+            if pid is not None:
+                return self._geo(pid)
+            for k in keys:
+                for pid in self.exact_all(k):
+                    if all(self._qualifies(pid, ql) for ql in qualifiers):
+                        return self._geo(pid)
+            return None
+
+        for finder in (self.exact, self.prefix, self.fuzzy):
+            for k in keys:
+                pid = finder(k)
+                if pid is not None:
+                    return self._geo(pid)
+        return None
+
+
+def _open_text(path: str) -> io.TextIOBase:
+    if path.endswith(".zip"):
+        zf = zipfile.ZipFile(path)
+        member = next(n for n in zf.namelist() if n.endswith(".txt") and "readme" not in n.lower())
+        return io.TextIOWrapper(zf.open(member), encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _read_geonames(path: str, min_population: int = 0):
+    with _open_text(path) as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) <= _COL_TZ:
+                continue
+            try:
+                lat, lon = float(cols[_COL_LAT]), float(cols[_COL_LON])
+                pop = int(cols[_COL_POP] or 0)
+            except ValueError:
+                continue
+            if pop < min_population:
+                continue
+            aliases = [cols[_COL_ASCII]] + [a for a in cols[_COL_ALT].split(",") if a]
+            yield (cols[_COL_NAME], aliases, lat, lon, pop, cols[_COL_TZ] or "UTC",
+                   cols[_COL_CC], cols[_COL_ADMIN1])
+
+
+def _read_region_names(folder: str) -> Dict[str, List[str]]:
+    """
+    讀取同資料夾的 admin1CodesASCII.txt（"US.IL", 名稱, ASCII 名稱）與 countryInfo.txt（ISO, ISO3, …, 國名）。
+    檔案不存在時回傳空 dict，限定詞只能以代碼（如「IL」「TW」）比對。
+    """
+    names: Dict[str, List[str]] = {}
+    admin1 = os.path.join(folder, ADMIN1_FILE)
+    if os.path.exists(admin1):
+        with open(admin1, "r", encoding="utf-8") as f:
+            for line in f:
+                cols = line.rstrip("\n").split("\t")
+                if len(cols) >= 3:
+                    names[cols[0]] = [cols[1], cols[2]]
+    countries = os.path.join(folder, COUNTRY_FILE)
+    if os.path.exists(countries):
+        with open(countries, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#"):
+                    continue
+                cols = line.rstrip("\n").split("\t")
+                if len(cols) >= 5:
+                    names[cols[0]] = [cols[1], cols[4]]
+    return names
+
+
+class GazetteerBackend:
+    """以本地地名索引回答查詢的地理編碼後端，不需網路。首次查詢時才載入檔案。"""
+    name = "gazetteer"
+
+    def __init__(self, path: str, min_population: int = 0):
+        self.path = path
+        self.min_population = min_population
+        self._index: Optional[Gazetteer] = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> Gazetteer:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = Gazetteer.from_file(self.path, self.min_population)
+                    logger.info(f"Gazetteer loaded: {len(self._index)} places, "
+                                f"{len(self._index.keys)} names from '{self.path}'.")
+        return self._index
+
+    def lookup(self, q: str) -> Optional[GeoOut]:
+        return self.index.lookup(q)
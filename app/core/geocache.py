@@ -0,0 +1,173 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import logging
+import unicodedata
+from typing import Any, Dict, Optional
+
+from ..schemas import GeoOut
+from ..utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_location(q: str) -> str:
+    """地名正規化：全形轉半形、去頭尾空白、合併空白、不分大小寫。"""
+    s = unicodedata.normalize("NFKC", q or "")
+    s = _WS_RE.sub(" ", s).strip().casefold()
+    return s.replace(" ,", ",").replace(", ", ",")
+
+
+class GeoCache:
+    """
+    兩層地理編碼快取：行程內 LRU + SQLite 磁碟儲存。
+    以正規化後的地名為鍵，保存 lat / lon / tz，並支援 TTL 與筆數上限淘汰。
+    """
+    def __init__(
+        self,
+        db_path: Optional[str],
+        memory_size: int = 4096,
+        disk_size: int = 200_000,
+        ttl: float = 30 * 86400,
+    ):
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.disk_size = max(0, int(disk_size))
+        self.memory = LRUCache(maxsize=memory_size, ttl=self.ttl)
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._puts_since_prune = 0
+        if db_path:
+            try:
+                folder = os.path.dirname(db_path)
+                if folder:
+                    os.makedirs(folder, exist_ok=True)
+                self._conn = sqlite3.connect(db_path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS geocode ("
+                    " key TEXT PRIMARY KEY,"
+                    " lat REAL NOT NULL,"
+                    " lon REAL NOT NULL,"
+                    " tz TEXT NOT NULL,"
+                    " created_at REAL NOT NULL,"
+                    " accessed_at REAL NOT NULL)"
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_geocode_accessed ON geocode(accessed_at)"
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Geocode disk cache disabled ({db_path}): {e}")
+                self._conn = None
+
+    def get(self, q: str) -> Optional[GeoOut]:
+        key = normalize_location(q)
+        geo = self.memory.get(key)
+        if geo is not None:
+            return geo
+        if self._conn is None:
+            return None
+
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT lat, lon, tz, created_at FROM geocode WHERE key = ?", (key,)
+                ).fetchone()
+                if row and self.ttl and row[3] + self.ttl <= now:
+                    self._conn.execute("DELETE FROM geocode WHERE key = ?", (key,))
+                    self._conn.commit()
+                    row = None
+                if row:
+                    self._conn.execute(
+                        "UPDATE geocode SET accessed_at = ? WHERE key = ?", (now, key)
+                    )
+                    self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Geocode disk cache read failed: {e}")
+                row = None
+            if not row:
+                self.disk_misses += 1
+                return None
+            self.disk_hits += 1
+
+        geo = GeoOut(lat=row[0], lon=row[1], tz=row[2])
+        remaining = row[3] + self.ttl - now if self.ttl else None
+        self.memory.put(key, geo, ttl=remaining)
+        return geo
+
+    def put(self, q: str, geo: GeoOut) -> None:
+        key = normalize_location(q)
+        self.memory.put(key, geo)
+        if self._conn is None:
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO geocode (key, lat, lon, tz, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, geo.lat, geo.lon, geo.tz, now, now),
+                )
+                self._puts_since_prune += 1
+                if self._puts_since_prune >= 256:
+                    self._prune(now)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Geocode disk cache write failed: {e}")
+
+    def _prune(self, now: float) -> None:
+        # 呼叫端需持有 self._lock
+        self._puts_since_prune = 0
+        if self.ttl:
+            self._conn.execute("DELETE FROM geocode WHERE created_at <= ?", (now - self.ttl,))
+        if self.disk_size:
+            self._conn.execute(
+                "DELETE FROM geocode WHERE key IN ("
+                " SELECT key FROM geocode ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.disk_size,),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        disk_rows = None
+        if self._conn is not None:
+            with self._lock:
+                try:
+                    disk_rows = self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+        return {
+            "memory": self.memory.stats(),
+            "disk": {
+                "enabled": self._conn is not None,
+                "size": disk_rows,
+                "maxsize": self.disk_size,
+                "hits": self.disk_hits,
+                "misses": self.disk_misses,
+            },
+        }
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        logger.warning(f"Invalid {name}={os.getenv(name)!r}, using {default}.")
+        return default
+
+
+def build_geocache_from_env() -> GeoCache:
+    db_path = os.getenv("GEOCODE_CACHE_PATH", "./cache/geocode.sqlite3").strip()
+    return GeoCache(
+        db_path=db_path or None,
+        memory_size=int(_env_float("GEOCODE_CACHE_MEMORY_SIZE", 4096)),
+        disk_size=int(_env_float("GEOCODE_CACHE_DISK_SIZE", 200_000)),
+        ttl=_env_float("GEOCODE_CACHE_TTL_DAYS", 30) * 86400,
+    )
@@ -1,20 +1,109 @@
+import os
+import logging
 from geopy.geocoders import Nominatim
-from timezonefinder import TimezoneFinder
 import pytz
 from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
 import swisseph as swe
 from ..schemas import GeoOut, ChartInput
+from .geocache import GeoCache, build_geocache_from_env, normalize_location
+from .gazetteer import GazetteerBackend
+from .tzresolver import get_tz_resolver
+from ..utils.concurrency import SingleFlight, TokenBucket
+
+logger = logging.getLogger(__name__)
 
 _geolocator = Nominatim(user_agent="astro_app")
-_tzf = TimezoneFinder()
+_geocache: Optional[GeoCache] = None
+_backends: Optional[list] = None
+_singleflight = SingleFlight()
+
+class NominatimBackend:
+    """
+    OpenStreetMap / Nominatim 線上地理編碼，時區由 TimezoneResolver 補上。
+    所有上游請求都先經過令牌桶，以符合 Nominatim 每秒 1 次的使用政策。
+    """
+    name = "nominatim"
+
+    def __init__(self, limiter: Optional[TokenBucket] = None):
+        self.limiter = limiter or TokenBucket(
+            rate=float(os.getenv("NOMINATIM_RATE", "1.0")),
+            burst=int(os.getenv("NOMINATIM_BURST", "1")),
+            max_queue=int(os.getenv("NOMINATIM_MAX_QUEUE", "32")),
+            max_wait=float(os.getenv("NOMINATIM_MAX_WAIT", "5.0")),
+        )
+
+    def lookup(self, q: str) -> Optional[GeoOut]:
+        self.limiter.acquire()
+        loc = _geolocator.geocode(q)
+        if not loc:
+            return None
+        lat, lon = float(loc.latitude), float(loc.longitude)
+        tzname = get_tz_resolver().timezone_at(lat, lon)
+        return GeoOut(lat=lat, lon=lon, tz=tzname)
+
+def _build_backends() -> list:
+    """
+    GEOCODER_BACKENDS 以逗號列出查詢順序（gazetteer / nominatim）。
+    未設定時：有 GAZETTEER_PATH 則先查本地地名庫，未命中再查 Nominatim；
+    GEOCODER_OFFLINE=1 時不使用任何網路後端。
+    """
+    gazetteer_path = os.getenv("GAZETTEER_PATH", "").strip()
+    names = [n.strip().lower() for n in os.getenv("GEOCODER_BACKENDS", "").split(",") if n.strip()]
+    if not names:
+        names = ["gazetteer", "nominatim"] if gazetteer_path else ["nominatim"]
+    if os.getenv("GEOCODER_OFFLINE", "0") == "1":
+        names = [n for n in names if n != "nominatim"]
+
+    backends: list = []
+    for n in names:
+        if n == "gazetteer":
+            if not gazetteer_path or not os.path.exists(gazetteer_path):
+                logger.warning(f"Gazetteer file not found at '{gazetteer_path}'. Backend skipped.")
+                continue
+            min_pop = int(os.getenv("GAZETTEER_MIN_POPULATION", "0") or 0)
+            backends.append(GazetteerBackend(gazetteer_path, min_population=min_pop))
+        elif n == "nominatim":
+            backends.append(NominatimBackend())
+        else:
+            logger.warning(f"Unknown geocoder backend '{n}'. Skipped.")
+    return backends
+
+def get_backends() -> list:
+    global _backends
+    if _backends is None:
+        _backends = _build_backends()
+    return _backends
+
+def get_geocache() -> GeoCache:
+    global _geocache
+    if _geocache is None:
+        _geocache = build_geocache_from_env()
+    return _geocache
+
+def _lookup_backends(q: str) -> GeoOut:
+    for backend in get_backends():
+        geo = backend.lookup(q)
+        if geo is not None:
+            get_geocache().put(q, geo)
+            return geo
+    raise ValueError("找不到地點")
 
 def geocode_location(q: str) -> GeoOut:
-    loc = _geolocator.geocode(q)
-    if not loc:
-        raise ValueError("找不到地點")
-    lat, lon = float(loc.latitude), float(loc.longitude)
-    tzname = _tzf.timezone_at(lat=lat, lng=lon) or "UTC"
-    return GeoOut(lat=lat, lon=lon, tz=tzname)
+    geo = get_geocache().get(q)
+    if geo is not None:
+        return geo
+    # 同一地點的並行查詢合併成一次上游呼叫
+    return _singleflight.do(normalize_location(q), lambda: _lookup_backends(q))
+
+def geocoder_stats() -> dict:
+    stats = {"cache": get_geocache().stats(), "singleflight": _singleflight.stats()}
+    for backend in get_backends():
+        limiter = getattr(backend, "limiter", None)
+        if limiter is not None:
+            stats[f"{backend.name}_limiter"] = limiter.stats()
+    return stats
 
 def to_julday_utc(inp: ChartInput, tzname: str) -> float:
     local = pytz.timezone(tzname)
@@ -22,3 +111,42 @@ def to_julday_utc(inp: ChartInput, tzname: str) -> float:
     dt_utc = dt_local.astimezone(pytz.utc)
     h = dt_utc.hour + dt_utc.minute / 60.0 + dt_utc.second / 3600.0
     return swe.julday(dt_utc.year, dt_utc.month, dt_utc.day, h)
+
+def julday_array(year, month, day, hour) -> np.ndarray:
+    """向量化的格里曆儒略日，結果與 swe.julday(..., GREG_CAL) 相同。"""
+    y = np.asarray(year, dtype=np.int64)
+    m = np.asarray(month, dtype=np.int64)
+    d = np.asarray(day, dtype=np.int64)
+    a = (14 - m) // 12
+    yy = y + 4800 - a
+    mm = m + 12 * a - 3
+    jdn = d + (153 * mm + 2) // 5 + 365 * yy + yy // 4 - yy // 100 + yy // 400 - 32045
+    return jdn - 0.5 + np.asarray(hour, dtype=np.float64) / 24.0
+
+def to_julday_utc_batch(inputs: Sequence[ChartInput], tznames: Sequence[str]) -> np.ndarray:
+    """
+    to_julday_utc 的批次版本：本地儒略日以 NumPy 一次算完，
+    再扣掉各筆的 UTC 偏移；偏移量依 (時區, 日期, 半小時) 快取（時區與夏令時間只在整點或半點切換），
+    同一時區的大量紀錄只需少數次 pytz 換算。
+    """
+    n = len(inputs)
+    if n != len(tznames):
+        raise ValueError("inputs 與 tznames 長度不一致")
+    cols = np.array([(i.year, i.month, i.day, i.hour, i.minute) for i in inputs],
+                    dtype=np.int64).reshape(n, 5)
+    jd_local = julday_array(cols[:, 0], cols[:, 1], cols[:, 2], cols[:, 3] + cols[:, 4] / 60.0)
+
+    offsets = np.empty(n, dtype=np.float64)
+    memo: Dict[Tuple, float] = {}
+    zones: Dict[str, pytz.BaseTzInfo] = {}
+    for idx, (inp, tzname) in enumerate(zip(inputs, tznames)):
+        key = (tzname, inp.year, inp.month, inp.day, inp.hour, inp.minute // 30)
+        off = memo.get(key)
+        if off is None:
+            zone = zones.get(tzname)
+            if zone is None:
+                zone = zones[tzname] = pytz.timezone(tzname)
+            dt_local = zone.localize(datetime(inp.year, inp.month, inp.day, inp.hour, inp.minute))
+            off = memo[key] = dt_local.utcoffset().total_seconds() / 3600.0
+        offsets[idx] = off
+    return jd_local - offsets / 24.0
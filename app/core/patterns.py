@@ -0,0 +1,232 @@
+import logging
+from itertools import combinations
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..constants import ASPECTS, ELEMENT_OF_SIGN, ZODIAC_CN
+from .aspects import separation_matrix
+from .ephemeris import positions_array
+from .rectify import houses_rowwise, sample_cusps
+
+logger = logging.getLogger(__name__)
+
+PATTERNS = ("grand_trine", "t_square", "stellium")
+ELEMENTS = ("火", "地", "風", "水")
+# 星座序號 → 元素序號
+_SIGN_ELEMENT = np.array([ELEMENTS.index(ELEMENT_OF_SIGN[s]) for s in ZODIAC_CN])
+_ORB = {name: (angle, orb) for name, angle, orb, _ in ASPECTS}
+
+CHUNK = 20000  # 每批取樣數，限制 (S, N, N) 角距陣列大小
+TOLERANCE_DAYS = 1.0 / 1440.0  # 邊界細化到 1 分鐘
+# 星象組合以度為單位的容許度判斷，星曆表誤差在 1 角分以內的天體即可直接插值
+POSITION_TOLERANCE = 1.0 / 60.0
+# jds (S,) → (是否成立 (S,), 參與的天體 (S, N))
+Detector = Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]]
+
+
+class SampleLimitExceeded(ValueError):
+    """搜尋所需的取樣數（粗取樣 + 宮位群星的細部取樣）超過上限。"""
+
+
+def _aspect_mask(sep: np.ndarray, name: str) -> np.ndarray:
+    angle, orb = _ORB[name]
+    return np.abs(sep - angle) <= orb
+
+
+def detect_grand_trine(lons: np.ndarray, element: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """(S, N) 黃經 → 任三顆彼此三合（可限定同一元素）。"""
+    n = lons.shape[1]
+    trine = _aspect_mask(separation_matrix(lons), "三合")
+    members = np.zeros(lons.shape, dtype=bool)
+    elem = _SIGN_ELEMENT[np.floor(lons % 360.0 / 30.0).astype(int)] if element else None
+    for i, j, k in combinations(range(n), 3):
+        hit = trine[:, i, j] & trine[:, j, k] & trine[:, i, k]
+        if element:
+            e = ELEMENTS.index(element)
+            hit &= (elem[:, i] == e) & (elem[:, j] == e) & (elem[:, k] == e)
+        members[:, [i, j, k]] |= hit[:, None]
+    return members.any(axis=1), members
+
+
+def detect_t_square(lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """兩顆對沖、第三顆（頂點）與兩者皆成刑。"""
+    n = lons.shape[1]
+    sep = separation_matrix(lons)
+    opp = _aspect_mask(sep, "對沖")
+    sq = _aspect_mask(sep, "刑")
+    members = np.zeros(lons.shape, dtype=bool)
+    for i, j in combinations(range(n), 2):
+        base = opp[:, i, j]
+        if not base.any():
+            continue
+        for k in range(n):
+            if k in (i, j):
+                continue
+            hit = base & sq[:, i, k] & sq[:, j, k]
+            members[:, [i, j, k]] |= hit[:, None]
+    return members.any(axis=1), members
+
+
+def detect_stellium(groups: np.ndarray, min_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """groups 為 (S, N) 的星座或宮位序號（0–11）；任一組內天體數 ≥ min_count。"""
+    onehot = groups[:, :, None] == np.arange(12)
+    counts = onehot.sum(axis=1)  # (S, 12)
+    best = counts.argmax(axis=1)
+    hit = counts.max(axis=1) >= min_count
+    members = (groups == best[:, None]) & hit[:, None]
+    return hit, members
+
+
+def min_cluster_arc(lons: np.ndarray, count: int) -> np.ndarray:
+    """每個取樣中，包含 count 顆天體的最短黃道弧長，形狀 (S,)。"""
+    s = np.sort(lons % 360.0, axis=1)
+    n = s.shape[1]
+    ext = np.concatenate([s, s + 360.0], axis=1)
+    return np.min(ext[:, count - 1:count - 1 + n] - ext[:, :n], axis=1)
+
+
+def make_detector(
+    pattern: str,
+    bodies: Sequence[str],
+    element: Optional[str] = None,
+    min_count: int = 4,
+    location: Optional[Tuple[float, float, bytes]] = None,
+) -> Detector:
+    """依條件組出向量偵測函式：jds (S,) → (mask (S,), members (S, N))。"""
+    def detect(jds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        lons, _, _ = positions_array(jds, bodies, POSITION_TOLERANCE)
+        if pattern == "grand_trine":
+            return detect_grand_trine(lons, element)
+        if pattern == "t_square":
+            return detect_t_square(lons)
+        if location is None:
+            return detect_stellium(np.floor(lons % 360.0 / 30.0).astype(int), min_count)
+        lat, lon, HSYS = location
+        _, _, cusps = sample_cusps(jds, lat, lon, HSYS)
+        return detect_stellium(houses_rowwise(cusps, lons) - 1, min_count)
+    return detect
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """連續 True 的 [起, 迄] 索引（含兩端）。"""
+    padded = np.concatenate([[False], mask, [False]])
+    d = np.diff(padded.astype(np.int8))
+    return list(zip(np.nonzero(d == 1)[0], np.nonzero(d == -1)[0] - 1))
+
+
+def _refine(detect: Detector, a: np.ndarray, b: np.ndarray, inside_at_a: np.ndarray, tol: float) -> np.ndarray:
+    """所有邊界同步二分：每一輪只呼叫一次 detect（一次 positions_array）。"""
+    a, b = a.astype(np.float64), b.astype(np.float64)
+    while len(a) and np.max(b - a) > tol:
+        m = 0.5 * (a + b)
+        same = detect(m)[0] == inside_at_a
+        a = np.where(same, m, a)
+        b = np.where(same, b, m)
+    return 0.5 * (a + b)
+
+
+def scan(
+    detect: Detector, start_jd: float, end_jd: float, step: float, tol: float = TOLERANCE_DAYS,
+) -> List[Tuple[float, float, np.ndarray]]:
+    """
+    以 step 日取樣 [start_jd, end_jd]，分批偵測後合併成連續區間，兩端以二分細化到 tol。
+    回傳 [(開始, 結束, 區間中點的參與天體)]。
+    """
+    n = max(2, int(np.ceil((end_jd - start_jd) / step)) + 1)
+    jds = np.minimum(start_jd + step * np.arange(n), end_jd)
+    mask = np.concatenate([detect(jds[s:s + CHUNK])[0] for s in range(0, n, CHUNK)])
+
+    runs = _runs(mask)
+    if not runs:
+        return []
+    first = np.array([i for i, _ in runs])
+    last = np.array([j for _, j in runs])
+    # 起點：前一個取樣不成立、本取樣成立；終點：本取樣成立、下一個取樣不成立
+    lo, hi = np.maximum(first - 1, 0), np.minimum(last + 1, n - 1)
+    edges = _refine(
+        detect,
+        np.concatenate([jds[lo], jds[last]]),
+        np.concatenate([jds[first], jds[hi]]),
+        np.concatenate([np.zeros(len(runs), dtype=bool), np.ones(len(runs), dtype=bool)]),
+        tol,
+    )
+    starts = np.where(first == 0, start_jd, edges[:len(runs)])
+    ends = np.where(last == n - 1, end_jd, edges[len(runs):])
+    _, members = detect(0.5 * (jds[first] + jds[last]))
+    return [(float(a), float(b), m) for a, b, m in zip(starts, ends, members)]
+
+
+def merge_intervals(intervals: List[Tuple[float, float]], gap: float = 0.0) -> List[Tuple[float, float]]:
+    """合併重疊或間隔不超過 gap 的區間。"""
+    merged: List[List[float]] = []
+    for a, b in sorted(intervals):
+        if merged and a <= merged[-1][1] + gap:
+            merged[-1][1] = max(merged[-1][1], b)
+        else:
+            merged.append([a, b])
+    return [(a, b) for a, b in merged]
+
+
+def search_patterns(
+    pattern: str,
+    start_jd: float,
+    end_jd: float,
+    bodies: Sequence[str],
+    element: Optional[str] = None,
+    min_count: int = 4,
+    location: Optional[Tuple[float, float, bytes]] = None,
+    step: Optional[float] = None,
+    max_samples: Optional[int] = None,
+) -> List[dict]:
+    """
+    在期間內搜尋星象組合，回傳合併後的區間（含參與的天體）。
+    含月亮時取樣 3 小時，否則 1 天。指定 location 的宮位群星分兩階段：
+    先以每日取樣找出群星彼此距離小於該地最大宮寬的日子，再只對這些日子以 4 分鐘取樣判斷宮位（上升約 4 分鐘移動 1°）。
+    max_samples 限制粗取樣與細部取樣的總數，超過時在開始細部掃描前丟出 SampleLimitExceeded。
+    """
+    if pattern not in PATTERNS:
+        raise ValueError(f"未知的星象組合：{pattern}")
+    if element and element not in ELEMENTS:
+        raise ValueError(f"未知的元素：{element}")
+    if pattern == "stellium" and not 2 <= min_count <= len(bodies):
+        raise ValueError("min_count 須介於 2 與天體數之間")
+    coarse = step or (0.125 if "月亮" in bodies else 1.0)
+    n = max(2, int(np.ceil((end_jd - start_jd) / coarse)) + 1)
+    if max_samples is not None and n > max_samples:
+        raise SampleLimitExceeded(f"搜尋範圍過大（約 {n} 次取樣，上限 {max_samples}），請縮短期間或排除月亮")
+    detect = make_detector(pattern, bodies, element, min_count, location)
+
+    if pattern == "stellium" and location is not None:
+        lat, lon, HSYS = location
+        probe = start_jd + np.arange(0.0, 1.0, 1.0 / 144.0)
+        _, _, cusps = sample_cusps(probe, lat, lon, HSYS)
+        widest = float(np.max((np.roll(cusps, -1, axis=1) - cusps) % 360.0))
+        days = np.minimum(start_jd + coarse * np.arange(n), end_jd)
+        arcs = np.concatenate([
+            min_cluster_arc(positions_array(days[s:s + CHUNK], bodies, POSITION_TOLERANCE)[0], min_count)
+            for s in range(0, n, CHUNK)
+        ])
+        # 取樣間天體仍會移動，放寬一天的移動量（月亮約 13°）
+        slack = 15.0 if "月亮" in bodies else 2.0
+        days_hit = arcs <= widest + slack
+        fine = 4.0 / 1440.0
+        windows = [
+            (max(start_jd, a), min(end_jd, b))
+            for a, b in merge_intervals([(days[i] - coarse, days[i] + coarse) for i in np.nonzero(days_hit)[0]])
+        ]
+        total = n + sum(max(2, int(np.ceil((b - a) / fine)) + 1) for a, b in windows)
+        if max_samples is not None and total > max_samples:
+            raise SampleLimitExceeded(
+                f"宮位群星需約 {total} 次取樣（上限 {max_samples}），請縮短期間、提高 min_count 或減少天體"
+            )
+        found = []
+        for a, b in windows:
+            found.extend(scan(detect, a, b, fine))
+    else:
+        found = scan(detect, start_jd, end_jd, coarse)
+
+    return [
+        {"start_jd": a, "end_jd": b, "bodies": [bodies[i] for i in np.nonzero(m)[0]]}
+        for a, b, m in found
+    ]
@@ -0,0 +1,168 @@
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import swisseph as swe
+
+from ..constants import PLANET_KEY, ZODIAC_CN
+from .astrology import asc_mc_from_armc, calc_chart
+from .ephemeris import positions_array
+
+logger = logging.getLogger(__name__)
+
+Constraint = Tuple[str, Optional[str], Optional[int]]  # (點, 星座, 宮位)
+
+ANGLES = ("上升", "天頂")
+POINTS = ANGLES + tuple(PLANET_KEY) + ("北交點", "南交點")
+DEFAULT_STEP_MINUTES = 2.0  # 上升約 4 分鐘 1°，2 分鐘取樣不會跨過整個星座或宮位
+TOLERANCE_DAYS = 1.0 / 86400.0  # 1 秒
+
+
+def validate_constraints(constraints: Sequence[Constraint]) -> None:
+    for point, sign, house in constraints:
+        if point not in POINTS:
+            raise ValueError(f"未知的點：{point}")
+        if sign is None and house is None:
+            raise ValueError(f"{point} 須指定星座或宮位")
+        if sign is not None and sign not in ZODIAC_CN:
+            raise ValueError(f"未知的星座：{sign}")
+        if house is not None and not 1 <= house <= 12:
+            raise ValueError("宮位須為 1–12")
+        if house is not None and point in ANGLES:
+            raise ValueError(f"{point} 只能指定星座")
+
+
+def sidereal_armc(jds: np.ndarray, lon) -> np.ndarray:
+    """
+    各時刻的 ARMC。恆星時只在每個 0h UT 呼叫一次 swe.sidtime，
+    當天其餘時刻以恆星日速率外推（一天內誤差遠小於 0.01 秒）。
+    """
+    day = np.floor(jds - 0.5) + 0.5
+    uniq, inv = np.unique(day, return_inverse=True)
+    st0 = np.array([swe.sidtime(float(d)) for d in uniq])
+    gst = st0[inv] + (jds - day) * 24.0 * 1.00273790935
+    return (gst * 15.0 + lon) % 360.0
+
+
+def sample_cusps(jds: np.ndarray, lat: float, lon: float, HSYS: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    各取樣時刻的 (asc, mc, cusps)，cusps 形狀 (S, 12)。
+    上升 / 天頂由 ARMC 解析向量計算；整宮 / 等宮的宮首直接由上升導出，其他宮位制逐點呼叫 swe.houses_armc。
+    """
+    eps = swe.calc_ut(float(jds[0]), swe.ECL_NUT)[0][0]  # 一天內黃赤交角變化可忽略
+    armc = sidereal_armc(np.asarray(jds, dtype=np.float64), lon)
+    asc, mc = asc_mc_from_armc(armc, lat, eps)
+    offsets = 30.0 * np.arange(12)
+    if HSYS == b"W":
+        cusps = (np.floor(asc / 30.0)[:, None] * 30.0 + offsets) % 360.0
+    elif HSYS == b"E":
+        cusps = (asc[:, None] + offsets) % 360.0
+    else:
+        try:
+            rows = [swe.houses_armc(float(a), lat, eps, HSYS) for a in armc]
+        except swe.Error as e:
+            raise ValueError(f"此緯度無法使用該宮位制：{e}")
+        cusps = np.array([r[0] for r in rows])
+        asc = np.array([r[1][0] for r in rows])
+        mc = np.array([r[1][1] for r in rows])
+    return asc, mc, cusps
+
+
+def houses_rowwise(cusps: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    每列各自的宮首：以第 1 宮展開後計算不大於黃經的宮首數，等同逐列 searchsorted。
+    cusps 形狀 (S, 12)，lons 形狀 (S,) 或 (S, N)，回傳與 lons 同形狀。
+    """
+    base = cusps[:, 0]
+    unwrapped = (cusps - base[:, None]) % 360.0
+    lons = np.asarray(lons, dtype=np.float64)
+    x = (lons - base.reshape((-1,) + (1,) * (lons.ndim - 1))) % 360.0
+    u = unwrapped.reshape((len(base),) + (1,) * (lons.ndim - 1) + (12,))
+    return np.sum(u <= x[..., None], axis=-1)
+
+
+def constraint_mask(
+    jds: np.ndarray, lat: float, lon: float, HSYS: bytes, constraints: Sequence[Constraint],
+) -> np.ndarray:
+    """所有條件在各取樣時刻是否同時成立，形狀 (S,)。"""
+    asc, mc, cusps = sample_cusps(jds, lat, lon, HSYS)
+    bodies = sorted({p for p, _, _ in constraints if p not in ANGLES and p != "南交點"}
+                    | ({"北交點"} if any(p == "南交點" for p, _, _ in constraints) else set()))
+    lons = {}
+    if bodies:
+        arr, _, _ = positions_array(jds, bodies)
+        lons = {b: arr[:, i] for i, b in enumerate(bodies)}
+    if "北交點" in lons:
+        lons["南交點"] = (lons["北交點"] + 180.0) % 360.0
+    lons["上升"], lons["天頂"] = asc, mc
+
+    mask = np.ones(len(jds), dtype=bool)
+    for point, sign, house in constraints:
+        x = lons[point]
+        if sign is not None:
+            mask &= np.floor((x % 360.0) / 30.0).astype(int) == ZODIAC_CN.index(sign)
+        if house is not None:
+            mask &= houses_rowwise(cusps, x) == house
+    return mask
+
+
+def chart_satisfies(data: dict, constraints: Sequence[Constraint]) -> bool:
+    """以 calc_chart 結果檢查條件，用於邊界細化，確保結果與實際排盤一致。"""
+    for point, sign, house in constraints:
+        if point == "上升":
+            s = data["asc_sign"]
+        elif point == "天頂":
+            s = data["mc_sign"]
+        else:
+            s = data["planet_signs"][point]
+        if sign is not None and s != sign:
+            return False
+        if house is not None and data["planet_houses"][point] != house:
+            return False
+    return True
+
+
+def _refine(lat: float, lon: float, HSYS: bytes, constraints, a: float, b: float, inside_at_a: bool) -> float:
+    """a、b 兩側條件成立與否不同，以 calc_chart 二分找出切換時刻。"""
+    while b - a > TOLERANCE_DAYS:
+        m = 0.5 * (a + b)
+        if chart_satisfies(calc_chart(m, lat, lon, HSYS), constraints) == inside_at_a:
+            a = m
+        else:
+            b = m
+    return 0.5 * (a + b)
+
+
+def rectify(
+    start_jd: float,
+    end_jd: float,
+    lat: float,
+    lon: float,
+    HSYS: bytes,
+    constraints: Sequence[Constraint],
+    step_minutes: float = DEFAULT_STEP_MINUTES,
+) -> List[Tuple[float, float]]:
+    """
+    在 [start_jd, end_jd] 之間找出所有條件同時成立的時段 [(開始, 結束)]。
+    先以 step_minutes 向量取樣找出成立的連續區段，再以 calc_chart 二分細化兩端到 1 秒。
+    短於取樣間距的時段可能漏掉，需要時調小 step_minutes。
+    """
+    validate_constraints(constraints)
+    step = step_minutes / 1440.0
+    n = max(2, int(np.ceil((end_jd - start_jd) / step)) + 1)
+    jds = np.minimum(start_jd + step * np.arange(n), end_jd)
+    mask = constraint_mask(jds, lat, lon, HSYS, constraints)
+
+    edges = np.nonzero(mask[1:] != mask[:-1])[0]
+    intervals: List[Tuple[float, float]] = []
+    start = start_jd if mask[0] else None
+    for k in edges:
+        t = _refine(lat, lon, HSYS, constraints, float(jds[k]), float(jds[k + 1]), bool(mask[k]))
+        if mask[k]:
+            intervals.append((start, t))
+            start = None
+        else:
+            start = t
+    if start is not None:
+        intervals.append((start, end_jd))
+    return intervals
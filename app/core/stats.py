@@ -0,0 +1,154 @@
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+import swisseph as swe
+
+from ..constants import (
+    ZODIAC_CN, ELEMENT_OF_SIGN, RULER_OF_SIGN, PLANET_KEY,
+    SCORES, ITEM_ORDER, essential_dignity
+)
+from .astrology import asc_mc_from_armc
+from .ephemeris import positions_array
+from .rectify import sidereal_armc
+
+logger = logging.getLogger(__name__)
+
+# 整數編碼：星座 0–11 依 ZODIAC_CN、行星 0–9 依 PLANET_KEY、元素依 build_element_tables 的摘要順序
+PLANETS: List[str] = list(PLANET_KEY)
+ELEMENT_ORDER = ["地", "水", "火", "風"]
+DIGNITY_ORDER = ["入廟", "擢升", "失勢", "落陷", "一般", "（無傳統）"]
+
+SIGN_ELEMENT = np.array([ELEMENT_ORDER.index(ELEMENT_OF_SIGN[s]) for s in ZODIAC_CN], dtype=np.int8)
+SIGN_RULER = np.array([PLANETS.index(RULER_OF_SIGN[s]) for s in ZODIAC_CN], dtype=np.int8)
+# (行星, 星座) → 黃道狀態代碼，由 essential_dignity 預先展開
+DIGNITY = np.array(
+    [[DIGNITY_ORDER.index(essential_dignity(p, s)) for s in ZODIAC_CN] for p in PLANETS],
+    dtype=np.int8,
+)
+SCORE_WEIGHTS = np.array(SCORES, dtype=np.int16)
+MAX_TOTAL = int(SCORE_WEIGHTS.sum())
+
+
+def chart_columns(jds: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    M 張星盤的欄位式資料：planets (M, 10) 星座代碼、asc / mc / south_node (M,) 星座代碼。
+    行星經 positions_array（有星曆表時整批插值），上升 / 天頂由 ARMC 向量解析計算，
+    恆星時與黃赤交角每個 0h UT 只呼叫一次 Swiss Ephemeris。
+    """
+    jds = np.asarray(jds, dtype=np.float64)
+    lons, _, _ = positions_array(jds, PLANETS + ["北交點"])
+
+    uniq, inv = np.unique(np.floor(jds - 0.5) + 0.5, return_inverse=True)
+    eps = np.array([swe.calc_ut(float(d), swe.ECL_NUT)[0][0] for d in uniq])[inv]
+    armc = sidereal_armc(jds, np.asarray(lon, dtype=np.float64))
+    asc, mc = asc_mc_from_armc(armc, np.asarray(lat, dtype=np.float64), eps)
+
+    def sign(x):
+        return np.floor((x % 360.0) / 30.0).astype(np.int8)
+
+    return {
+        "planets": sign(lons[:, :len(PLANETS)]),
+        "asc": sign(asc),
+        "mc": sign(mc),
+        "south_node": sign(lons[:, len(PLANETS)] + 180.0),
+    }
+
+
+def item_signs(cols: Dict[str, np.ndarray]) -> np.ndarray:
+    """ITEM_ORDER 各項目的星座代碼，形狀 (M, 17)；守護星項目取該守護星所在星座。"""
+    planets = cols["planets"]
+    rows = np.arange(len(planets))
+
+    def ruler_sign(sign_codes):
+        return planets[rows, SIGN_RULER[sign_codes]]
+
+    p = {name: planets[:, i] for i, name in enumerate(PLANETS)}
+    resolved = {
+        "上升": cols["asc"],
+        "上升守護星(命主星)": ruler_sign(cols["asc"]),
+        "太陽守護星": ruler_sign(p["太陽"]),
+        "月亮守護星": ruler_sign(p["月亮"]),
+        "天頂": cols["mc"],
+        "天頂守護星": ruler_sign(cols["mc"]),
+        "南交點": cols["south_node"],
+        **p,
+    }
+    return np.stack([resolved[label] for label in ITEM_ORDER], axis=1)
+
+
+def element_totals(cols: Dict[str, np.ndarray]) -> np.ndarray:
+    """SCORES 加權的元素總分，形狀 (M, 4)，欄位順序為 ELEMENT_ORDER；與 build_element_tables 的總分一致。"""
+    elems = SIGN_ELEMENT[item_signs(cols)]
+    return np.stack([((elems == e) * SCORE_WEIGHTS).sum(axis=1) for e in range(len(ELEMENT_ORDER))], axis=1)
+
+
+def dignity_codes(cols: Dict[str, np.ndarray]) -> np.ndarray:
+    """各行星的黃道狀態代碼，形狀 (M, 10)，對應 DIGNITY_ORDER。"""
+    return DIGNITY[np.arange(len(PLANETS)), cols["planets"]]
+
+
+class PopulationStats:
+    """
+    可分批累加的統計：每批只保留整數直方圖，記憶體與資料量無關。
+    - element_hist (4, MAX_TOTAL+1)：各元素總分的分佈
+    - dominant (4,)：最高分元素（同分時取 ELEMENT_ORDER 較前者）
+    - dignity (10, 6)、planet_signs (10, 12)、asc_signs (12,)
+    """
+    def __init__(self):
+        self.count = 0
+        self.element_hist = np.zeros((len(ELEMENT_ORDER), MAX_TOTAL + 1), dtype=np.int64)
+        self.dominant = np.zeros(len(ELEMENT_ORDER), dtype=np.int64)
+        self.dignity = np.zeros((len(PLANETS), len(DIGNITY_ORDER)), dtype=np.int64)
+        self.planet_signs = np.zeros((len(PLANETS), 12), dtype=np.int64)
+        self.asc_signs = np.zeros(12, dtype=np.int64)
+        self.element_sum = np.zeros(len(ELEMENT_ORDER), dtype=np.int64)
+
+    def update(self, cols: Dict[str, np.ndarray]) -> None:
+        totals = element_totals(cols)
+        dig = dignity_codes(cols)
+        n, k = len(totals), len(PLANETS)
+        self.count += n
+        for e in range(len(ELEMENT_ORDER)):
+            self.element_hist[e] += np.bincount(totals[:, e], minlength=MAX_TOTAL + 1)
+        self.element_sum += totals.sum(axis=0)
+        self.dominant += np.bincount(totals.argmax(axis=1), minlength=len(ELEMENT_ORDER))
+        planet_idx = np.broadcast_to(np.arange(k), (n, k))
+        self.dignity += np.bincount(
+            (planet_idx * len(DIGNITY_ORDER) + dig).ravel(), minlength=k * len(DIGNITY_ORDER)
+        ).reshape(k, len(DIGNITY_ORDER))
+        self.planet_signs += np.bincount(
+            (planet_idx * 12 + cols["planets"]).ravel(), minlength=k * 12
+        ).reshape(k, 12)
+        self.asc_signs += np.bincount(cols["asc"], minlength=12)
+
+    def merge(self, other: "PopulationStats") -> None:
+        self.count += other.count
+        for name in ("element_hist", "dominant", "dignity", "planet_signs", "asc_signs", "element_sum"):
+            getattr(self, name).__iadd__(getattr(other, name))
+
+    def to_dict(self) -> dict:
+        mean: Optional[List[float]] = (
+            (self.element_sum / self.count).round(3).tolist() if self.count else None
+        )
+        return {
+            "count": self.count,
+            "elements": ELEMENT_ORDER,
+            "element_mean": dict(zip(ELEMENT_ORDER, mean)) if mean else {},
+            "element_histograms": {e: self.element_hist[i].tolist() for i, e in enumerate(ELEMENT_ORDER)},
+            "dominant_element": dict(zip(ELEMENT_ORDER, self.dominant.tolist())),
+            "dignity": {
+                p: dict(zip(DIGNITY_ORDER, self.dignity[i].tolist())) for i, p in enumerate(PLANETS)
+            },
+            "planet_signs": {
+                p: dict(zip(ZODIAC_CN, self.planet_signs[i].tolist())) for i, p in enumerate(PLANETS)
+            },
+            "asc_signs": dict(zip(ZODIAC_CN, self.asc_signs.tolist())),
+        }
+
+
+def stats_for(jds: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> PopulationStats:
+    """單批星盤的統計；模組層級函式，可直接交給行程池。"""
+    stats = PopulationStats()
+    stats.update(chart_columns(jds, lat, lon))
+    return stats
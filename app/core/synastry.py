@@ -0,0 +1,161 @@
+import logging
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..constants import deg_to_sign, wrap360
+from .astrology import FAST_HSYS, assign_houses, fast_cusps
+from .aspects import AspectSpec, PLANET_POINTS, NODE_POINTS, ANGLE_POINTS, point_lons, match_aspects
+
+logger = logging.getLogger(__name__)
+
+SYNASTRY_POINTS = PLANET_POINTS + NODE_POINTS + ANGLE_POINTS
+OVERLAY_POINTS = PLANET_POINTS + NODE_POINTS
+
+# 配對分數：相位權重 × 點位權重 × 緊密度（1 − 偏離 / 容許度）
+SYNASTRY_WEIGHTS: Dict[str, float] = {
+    "合相": 3.0, "三合": 2.0, "六合": 1.0, "刑": -2.0, "對沖": -1.0,
+}
+POINT_WEIGHTS: Dict[str, float] = {
+    "太陽": 2.0, "月亮": 2.0, "金星": 2.0, "火星": 1.5, "上升": 1.5,
+}
+MATCH_CHUNK = 2048  # 一對多評分時每批的候選數，限制中間陣列大小
+
+
+def cross_separation(lons_a: np.ndarray, lons_b: np.ndarray) -> np.ndarray:
+    """(..., N) 與 (..., M) 黃經 → (..., N, M) 最短角距。"""
+    a = np.asarray(lons_a, dtype=np.float64) % 360.0
+    b = np.asarray(lons_b, dtype=np.float64) % 360.0
+    d = np.abs(a[..., :, None] - b[..., None, :])
+    return np.where(d <= 180.0, d, 360.0 - d)
+
+
+def cross_aspects(
+    data_a: dict, data_b: dict, aspects: Sequence[AspectSpec],
+    points: Sequence[str] = SYNASTRY_POINTS,
+) -> dict:
+    """
+    兩張星盤的交叉相位矩陣：rows 為 A 的點、cols 為 B 的點。
+    回傳矩陣形式（kind 為相位名稱或 None）與依相位表順序、偏離角度排序的相位列。
+    """
+    sep = cross_separation(point_lons(data_a, points), point_lons(data_b, points))
+    kind, dev = match_aspects(sep, aspects)
+    ii, jj = np.nonzero(kind >= 0)
+    devs = np.round(dev[ii, jj], 2)
+    order = np.lexsort((devs, kind[ii, jj]))
+    rows = [
+        {
+            "組合": f"{points[ii[o]]}-{points[jj[o]]}",
+            "類型": aspects[kind[ii[o], jj[o]]][0],
+            "偏離角度": float(devs[o]),
+        }
+        for o in order
+    ]
+    matrix = [
+        [aspects[k][0] if k >= 0 else None for k in row]
+        for row in kind.tolist()
+    ]
+    deviations = [
+        [round(d, 2) if k >= 0 else None for k, d in zip(krow, drow)]
+        for krow, drow in zip(kind.tolist(), dev.tolist())
+    ]
+    return {
+        "points": list(points),
+        "matrix": matrix,
+        "deviations": deviations,
+        "rows": rows,
+        "score": round(float(_score(kind, dev, aspects, points, points)), 2),
+    }
+
+
+def house_overlays(data_host: dict, data_guest: dict, points: Sequence[str] = OVERLAY_POINTS) -> Dict[str, int]:
+    """guest 的各點落在 host 的第幾宮；一次 searchsorted。"""
+    houses = assign_houses(data_host["cusps"], point_lons(data_guest, points))
+    return dict(zip(points, houses.tolist()))
+
+
+def _midpoint(a, b):
+    """短弧中點。"""
+    a = np.asarray(a, dtype=np.float64)
+    d = (np.asarray(b, dtype=np.float64) - a + 180.0) % 360.0 - 180.0
+    return (a + d / 2.0) % 360.0
+
+
+def composite_chart(data_a: dict, data_b: dict, HSYS: bytes) -> dict:
+    """
+    中點組合盤，格式與 calc_chart 相同（可直接交給 build_chart_tables）。
+    整宮 / 等宮以組合上升重新起宮，其他宮位制取兩盤宮首的中點。
+    """
+    names = list(data_a["planet_lons"])
+    lons = _midpoint([data_a["planet_lons"][p] for p in names], [data_b["planet_lons"][p] for p in names])
+    asc, mc, north_node = (float(x) for x in _midpoint(
+        [data_a["asc"], data_a["mc"], data_a["north_node"]],
+        [data_b["asc"], data_b["mc"], data_b["north_node"]],
+    ))
+    south_node = wrap360(north_node + 180.0)
+    if HSYS in FAST_HSYS:
+        cusps = fast_cusps(asc, HSYS)
+    else:
+        cusps = _midpoint(data_a["cusps"], data_b["cusps"]).tolist()
+
+    planet_lons = {p: float(v) for p, v in zip(names, lons)}
+    planet_signs = {p: deg_to_sign(v) for p, v in planet_lons.items()}
+    planet_signs["北交點"] = deg_to_sign(north_node)
+    planet_signs["南交點"] = deg_to_sign(south_node)
+    house_names = names + ["北交點", "南交點", "天頂"]
+    houses = assign_houses(cusps, list(lons) + [north_node, south_node, mc]).tolist()
+    return {
+        "asc": asc,
+        "mc": mc,
+        "asc_sign": deg_to_sign(asc),
+        "mc_sign": deg_to_sign(mc),
+        "cusps": [wrap360(c) for c in cusps],
+        "planet_lons": planet_lons,
+        "planet_signs": planet_signs,
+        "planet_houses": dict(zip(house_names, houses)),
+        "north_node": north_node,
+        "south_node": south_node,
+    }
+
+
+def _score(
+    kind: np.ndarray, dev: np.ndarray, aspects: Sequence[AspectSpec],
+    points_a: Sequence[str], points_b: Sequence[str],
+) -> np.ndarray:
+    """kind / dev 形狀 (..., N, M)，回傳 (...) 的配對分數。"""
+    weights = np.array([SYNASTRY_WEIGHTS.get(a[0], 0.0) for a in aspects] + [0.0])
+    orbs = np.array([a[2] for a in aspects] + [1.0])
+    wa = np.array([POINT_WEIGHTS.get(p, 1.0) for p in points_a])
+    wb = np.array([POINT_WEIGHTS.get(p, 1.0) for p in points_b])
+    closeness = np.where(kind >= 0, 1.0 - np.nan_to_num(dev) / orbs[kind], 0.0)
+    contrib = weights[kind] * closeness * wa[:, None] * wb[None, :]
+    return contrib.sum(axis=(-2, -1))
+
+
+def score_many(
+    lons_a: np.ndarray, lons_many: np.ndarray, aspects: Sequence[AspectSpec],
+    points: Sequence[str] = PLANET_POINTS, chunk: Optional[int] = None,
+) -> np.ndarray:
+    """
+    一張星盤對 K 張星盤的配對分數。lons_a 形狀 (N,)、lons_many 形狀 (K, N)，
+    分批廣播成 (k, N, N) 角距矩陣後一次比對，回傳 (K,)。
+    """
+    lons_many = np.atleast_2d(np.asarray(lons_many, dtype=np.float64))
+    chunk = chunk or MATCH_CHUNK
+    out = np.empty(lons_many.shape[0])
+    for s in range(0, lons_many.shape[0], chunk):
+        part = lons_many[s:s + chunk]
+        sep = cross_separation(np.broadcast_to(lons_a, part.shape), part)
+        kind, dev = match_aspects(sep, aspects)
+        out[s:s + chunk] = _score(kind, dev, aspects, points, points)
+    return out
+
+
+def top_matches(scores: np.ndarray, top_n: Optional[int]) -> List[int]:
+    """分數由高到低的索引；top_n 時以 argpartition 只排序前 n 名。"""
+    n = len(scores)
+    if top_n and top_n < n:
+        idx = np.argpartition(-scores, top_n - 1)[:top_n]
+    else:
+        idx = np.arange(n)
+    return idx[np.argsort(-scores[idx], kind="stable")].tolist()
@@ -0,0 +1,151 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pytz
+import swisseph as swe
+
+from ..constants import PLANET_KEY, ZODIAC_CN
+from .aspects import AspectSpec, PLANET_POINTS, ANGLE_POINTS, point_lons
+from .ephemeris import positions_array, swe_state
+
+logger = logging.getLogger(__name__)
+
+EVENT_KINDS = ("aspect", "ingress", "station")
+NATAL_POINTS = PLANET_POINTS + ANGLE_POINTS
+# 粗取樣步長（日）：相鄰取樣間目標函數至多一次變號即可；月亮一天約 13°，取 6 小時
+SAMPLE_STEP: Dict[str, float] = {"月亮": 0.25}
+DEFAULT_STEP = 1.0
+TOLERANCE_DAYS = 1.0 / 2880.0  # 30 秒
+WINDOW_DAYS = 30.0
+# 太陽、月亮不會逆行
+_NO_STATION = {"太陽", "月亮"}
+
+
+def _wrap180(x):
+    return (x + 180.0) % 360.0 - 180.0
+
+
+def jd_to_datetime(jd_ut: float) -> datetime:
+    y, m, d, h = swe.revjul(jd_ut)
+    return pytz.utc.localize(datetime(y, m, d)) + timedelta(hours=h)
+
+
+def bisect_root(f: Callable[[float], float], a: float, b: float, fa: float, tol: float = TOLERANCE_DAYS) -> float:
+    """f(a) 與 f(b) 異號時二分到區間寬度小於 tol，回傳根的位置。"""
+    while b - a > tol:
+        m = 0.5 * (a + b)
+        fm = f(m)
+        if (fm >= 0.0) == (fa >= 0.0):
+            a, fa = m, fm
+        else:
+            b = m
+    return float(0.5 * (a + b))
+
+
+def _brackets(g: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    g 形狀 (S, T)：回傳相鄰取樣間變號的 (取樣索引, 欄索引)。
+    角度差在 ±180° 處的跳躍不是根，以前後差值小於 180° 排除。
+    """
+    pos = g >= 0.0
+    change = (pos[:-1] != pos[1:]) & (np.abs(g[1:] - g[:-1]) < 180.0)
+    return np.nonzero(change)
+
+
+def aspect_targets(
+    natal_lons: Dict[str, float], aspects: Sequence[AspectSpec],
+) -> List[Tuple[str, str, float]]:
+    """(本命點, 相位名稱, 目標黃經)；非 0° / 180° 的相位兩側各一個目標。"""
+    targets = []
+    for point, lon in natal_lons.items():
+        for name, angle, _, _ in aspects:
+            sides = (angle,) if angle in (0.0, 180.0) else (angle, -angle)
+            for a in sides:
+                targets.append((point, name, (lon + a) % 360.0))
+    return targets
+
+
+def find_events(
+    natal_lons: Dict[str, float],
+    start_jd: float,
+    end_jd: float,
+    aspects: Sequence[AspectSpec],
+    bodies: Sequence[str] = PLANET_POINTS,
+    kinds: Sequence[str] = EVENT_KINDS,
+    tol: float = TOLERANCE_DAYS,
+) -> List[dict]:
+    """
+    [start_jd, end_jd) 之間的推運事件，依時間排序。
+    每個天體以 positions_array 一次取樣整段期間，對所有目標以向量運算找出變號區間，
+    再逐一以 swe.calc_ut 二分細化到 tol 日以內。
+    """
+    targets = aspect_targets(natal_lons, aspects) if "aspect" in kinds else []
+    target_lons = np.array([t[2] for t in targets])
+    boundaries = np.arange(12) * 30.0
+    events: List[dict] = []
+
+    for body in bodies:
+        pid = PLANET_KEY[body]
+        step = SAMPLE_STEP.get(body, DEFAULT_STEP)
+        n = max(2, int(np.ceil((end_jd - start_jd) / step)) + 1)
+        jds = start_jd + step * np.arange(n)
+        lon, _, speed = positions_array(jds, [body])
+        lon, speed = lon[:, 0], speed[:, 0]
+
+        def lon_minus(target: float) -> Callable[[float], float]:
+            return lambda jd: _wrap180(swe_state(jd, pid)[0] - target)
+
+        if len(targets):
+            g = _wrap180(lon[:, None] - target_lons[None, :])
+            for k, t in zip(*_brackets(g)):
+                point, name, target = targets[t]
+                jd = bisect_root(lon_minus(target), jds[k], jds[k + 1], g[k, t], tol)
+                events.append({"type": "aspect", "jd_ut": jd, "body": body, "aspect": name, "natal": point})
+
+        if "ingress" in kinds:
+            g = _wrap180(lon[:, None] - boundaries[None, :])
+            for k, s in zip(*_brackets(g)):
+                jd = bisect_root(lon_minus(boundaries[s]), jds[k], jds[k + 1], g[k, s], tol)
+                entering = s if speed[k] >= 0 else (s - 1) % 12
+                events.append({"type": "ingress", "jd_ut": jd, "body": body, "sign": ZODIAC_CN[entering]})
+
+        if "station" in kinds and body not in _NO_STATION:
+            for k, _ in zip(*_brackets(speed[:, None])):
+                jd = bisect_root(lambda x: swe_state(x, pid)[2], jds[k], jds[k + 1], speed[k], tol)
+                events.append({"type": "station", "jd_ut": jd, "body": body,
+                               "direction": "逆行" if speed[k] > 0 else "順行"})
+
+    events = [e for e in events if start_jd <= e["jd_ut"] < end_jd]
+    events.sort(key=lambda e: e["jd_ut"])
+    return events
+
+
+def iter_transit_events(
+    natal: dict,
+    start_jd: float,
+    end_jd: float,
+    aspects: Sequence[AspectSpec],
+    bodies: Sequence[str] = PLANET_POINTS,
+    kinds: Sequence[str] = EVENT_KINDS,
+    window: float = WINDOW_DAYS,
+    tzname: Optional[str] = None,
+) -> Iterator[List[dict]]:
+    """
+    依 window 日切段產生事件，每段一個已排序的 list，段與段之間也依時間遞增，
+    呼叫端可邊算邊輸出。natal 為 calc_chart 結果，比對行星與上升 / 天頂。
+    """
+    natal_lons = dict(zip(NATAL_POINTS, point_lons(natal, NATAL_POINTS).tolist()))
+    local = pytz.timezone(tzname) if tzname else None
+    w0 = start_jd
+    while w0 < end_jd:
+        w1 = min(end_jd, w0 + window)
+        events = find_events(natal_lons, w0, w1, aspects, bodies, kinds)
+        for e in events:
+            dt = jd_to_datetime(e["jd_ut"])
+            e["utc"] = dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+            if local is not None:
+                e["local"] = dt.astimezone(local).strftime("%Y-%m-%d %H:%M")
+        yield events
+        w0 = w1
@@ -0,0 +1,100 @@
+import os
+import math
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from timezonefinder import TimezoneFinder
+
+from ..utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_BORDER = "__border__"
+
+
+class TimezoneResolver:
+    """
+    座標 → IANA 時區。座標先對齊到 grid_deg 大小的格子，每格只判定一次：
+    四角與中心都落在同一時區的格子直接快取結果；跨越時區邊界的格子標記為 border，
+    之後落在該格的查詢才做完整的多邊形判定。
+
+    注意：小於一格的飛地可能被四角與中心同時略過，grid_deg 應依需求調小；
+    grid_deg <= 0 時停用格子快取，每次都做完整判定。
+    in_memory=True 時 TimezoneFinder 將資料整份載入記憶體（查詢較快、RSS 較高），
+    否則以檔案方式讀取。TimezoneFinder 於第一次查詢時才建立。
+    """
+    def __init__(self, grid_deg: float = 0.1, in_memory: bool = False, cache_size: int = 65536):
+        self.grid_deg = grid_deg if grid_deg and grid_deg > 0 else 0.0
+        self.in_memory = in_memory
+        self.cells = LRUCache(maxsize=cache_size)
+        self.exact_lookups = 0
+        self._finder: Optional[TimezoneFinder] = None
+        self._lock = threading.Lock()
+
+    @property
+    def finder(self) -> TimezoneFinder:
+        if self._finder is None:
+            with self._lock:
+                if self._finder is None:
+                    self._finder = TimezoneFinder(in_memory=self.in_memory)
+                    logger.info(f"TimezoneFinder initialized (in_memory={self.in_memory}).")
+        return self._finder
+
+    def _exact(self, lat: float, lon: float) -> str:
+        self.exact_lookups += 1
+        lat = min(90.0, max(-90.0, lat))
+        lon = ((lon + 180.0) % 360.0) - 180.0
+        return self.finder.timezone_at(lat=lat, lng=lon) or "UTC"
+
+    def _cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        g = self.grid_deg
+        return int(math.floor(lat / g)), int(math.floor(lon / g))
+
+    def _classify(self, cell: Tuple[int, int]) -> str:
+        g = self.grid_deg
+        lat0, lon0 = cell[0] * g, cell[1] * g
+        samples = [
+            (lat0, lon0), (lat0 + g, lon0), (lat0, lon0 + g), (lat0 + g, lon0 + g),
+            (lat0 + g / 2, lon0 + g / 2),
+        ]
+        zones = {self._exact(la, lo) for la, lo in samples}
+        return zones.pop() if len(zones) == 1 else _BORDER
+
+    def timezone_at(self, lat: float, lon: float) -> str:
+        if not self.grid_deg:
+            return self._exact(lat, lon)
+        cell = self._cell_of(lat, lon)
+        tz = self.cells.get(cell)
+        if tz is None:
+            tz = self._classify(cell)
+            self.cells.put(cell, tz)
+        if tz == _BORDER:
+            return self._exact(lat, lon)
+        return tz
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "grid_deg": self.grid_deg,
+            "in_memory": self.in_memory,
+            "cells": self.cells.stats(),
+            "exact_lookups": self.exact_lookups,
+        }
+
+
+_resolver: Optional[TimezoneResolver] = None
+
+
+def get_tz_resolver() -> TimezoneResolver:
+    global _resolver
+    if _resolver is None:
+        try:
+            grid = float(os.getenv("TZ_GRID_DEG", "0.1"))
+        except ValueError:
+            grid = 0.1
+        _resolver = TimezoneResolver(
+            grid_deg=grid,
+            in_memory=os.getenv("TZF_IN_MEMORY", "0") == "1",
+            cache_size=int(os.getenv("TZ_CACHE_SIZE", "65536") or 65536),
+        )
+    return _resolver
@@ -1,33 +1,57 @@
 import os
+import hashlib
 import logging
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import FastAPI, Query, Request
+import pytz
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 import google.generativeai as genai
 import swisseph as swe
 
+# 先載入 .env：ASPECT_CONFIG、HOUSE_POS_METHOD 等設定在模組匯入時讀取
+load_dotenv()
+
 # Internal Imports
-from .constants import SYMBOL, HOUSE_SYSTEMS_CODE2CN
-from .schemas import ChartInput, GeoOut
-from .core.geocoder import geocode_location, to_julday_utc
-from .core.astrology import calc_chart, resolve_hsys
+from .constants import (
+    SYMBOL, HOUSE_SYSTEMS_CODE2CN, HOUSE_SYSTEMS_CN2CODE, HOUSE_NAMES, HOUSE_MEANINGS,
+    ZODIAC_CN, ELEMENT_OF_SIGN, RULER_OF_SIGN,
+)
+from .schemas import ChartInput, GeoOut, MatchRequest, RectifyRequest, SynastryRequest
+from .core.geocoder import geocode_location, to_julday_utc, geocoder_stats
+from .core.tzresolver import get_tz_resolver
+from .utils.concurrency import QueueFullError
+from .core.astrology import resolve_hsys
+from .core.aspects import PLANET_POINTS
+from .core.transits import EVENT_KINDS
+from .core.patterns import PATTERNS, SampleLimitExceeded
 from .services.rag import get_retriever, _qdrant_vector_store
-from .services.ai import gemini_interpretations, build_ai_advice_md, build_credits_md
+from .services.ai import build_credits_md, generate_ai_content, interpretation_prompts, stream_ai_advice
+from .services.library import get_library
+from .services.llm_cache import get_llm_cache
+from .services.bulk import resolve_birth_record, spool_upload, stream_bulk_charts
+from .services.chart_cache import cached_chart, cached_charts, get_chart_cache
+from .services.transits import (
+    get_calendar_cache, max_transit_days, natal_cache_key, natal_for, parse_list, parse_month, parse_start,
+    stream_calendar, stream_transits,
+)
+from .services.patterns import patterns_payload
+from .services.rectify import rectify_payload
+from .services.synastry import composite_payload, match_payload, max_candidates, synastry_payload
 from .utils.formatters import (
-    build_four_kings, build_element_tables, build_houses_table,
-    build_positions_table, build_aspects_table, 
-    summarize_house_focus, summarize_major_aspects
+    TABLE_FIELDS, build_four_kings, summarize_house_focus, summarize_major_aspects
 )
+from .utils.jsonfast import FastJSONResponse, dumps
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Load Environment and Configure AI
-load_dotenv()
+# Configure AI
 GEMINI_ENABLED = False
 if os.getenv("GEMINI_API_KEY"):
     genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
@@ -47,6 +71,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(QueueFullError)
+def queue_full_handler(request: Request, exc: QueueFullError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(round(exc.retry_after)))},
+    )
+
 # Serve Frontend
 try:
     if os.path.exists("frontend/dist"):
@@ -59,12 +91,173 @@ except Exception as e:
 def health_check():
     return {"status": "ok"}
 
+@app.get("/api/metrics")
+def api_metrics():
+    return {
+        "geocoder": geocoder_stats(),
+        "timezone": get_tz_resolver().stats(),
+        "chart_cache": get_chart_cache().stats(),
+        "calendar_cache": get_calendar_cache().stats(),
+        "llm_cache": get_llm_cache().stats(),
+    }
+
+_meta_body: Optional[bytes] = None
+_meta_etag = ""
+
+@app.get("/api/meta")
+def api_meta(request: Request):
+    """
+    不隨星盤改變的常數（符號、星座、宮位名稱與意涵、宮位制），內容只在啟動後產生一次。
+    搭配 /api/chart?fields=... 使用，前端可長期快取；帶 If-None-Match 時回 304。
+    """
+    global _meta_body, _meta_etag
+    if _meta_body is None:
+        _meta_body = dumps({
+            "symbols": SYMBOL,
+            "zodiac": ZODIAC_CN,
+            "element_of_sign": ELEMENT_OF_SIGN,
+            "ruler_of_sign": RULER_OF_SIGN,
+            "house_names": HOUSE_NAMES,
+            "house_meanings": {str(k): v for k, v in HOUSE_MEANINGS.items()},
+            "house_systems": {cn: code.decode("ascii") for cn, code in HOUSE_SYSTEMS_CN2CODE.items()},
+            "fields": {
+                "chart": list(CHART_FIELDS),
+                "tables": list(TABLE_FIELDS),
+                "extra": list(EXTRA_FIELDS),
+                "aliases": {k: list(v) for k, v in FIELD_ALIASES.items()},
+            },
+        })
+        _meta_etag = '"' + hashlib.sha1(_meta_body).hexdigest()[:16] + '"'
+    headers = {"ETag": _meta_etag, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == _meta_etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=_meta_body, media_type="application/json", headers=headers)
+
 @app.get("/api/geocode", response_model=GeoOut)
 def api_geocode(location: str = Query(..., description="地名或地址")):
     return geocode_location(location)
 
+def _parse_house_systems(HSYS: bytes, house_systems: Optional[str]) -> List[bytes]:
+    systems = [HSYS]
+    for item in (house_systems or "").replace("，", ",").split(","):
+        if item.strip():
+            code = resolve_hsys(item)
+            if code not in systems:
+                systems.append(code)
+    return systems
+
+# 星盤本體欄位（繪製星盤所需）；fields=wheel 只回傳這些
+CHART_FIELDS = (
+    "geo", "asc", "mc", "asc_sign", "mc_sign", "cusps",
+    "planet_lons", "planet_signs", "planet_houses", "north_node", "south_node",
+)
+EXTRA_FIELDS = ("symbols", "house_system_cn", "ai_advice_md", "rag_active", "systems", "credits_md", "ai_generated")
+FIELD_ALIASES = {"wheel": CHART_FIELDS, "tables": TABLE_FIELDS}
+# 精簡模式下 houses_rows 省略的靜態欄位，改由 /api/meta 提供
+_STATIC_HOUSE_COLUMNS = ("宮名", "宮位意涵")
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """fields 以逗號分隔，可用 wheel / tables 別名；未指定時回傳 None（完整輸出）。"""
+    if not fields:
+        return None
+    allowed = CHART_FIELDS + TABLE_FIELDS + EXTRA_FIELDS
+    selected: List[str] = []
+    for item in fields.replace("，", ",").split(","):
+        name = item.strip()
+        if not name:
+            continue
+        if name not in allowed and name not in FIELD_ALIASES:
+            raise HTTPException(status_code=400, detail=f"未知的欄位：{name}")
+        for f in FIELD_ALIASES.get(name, (name,)):
+            if f not in selected:
+                selected.append(f)
+    return selected or None
+
+def _lean_houses(rows: List[dict]) -> List[dict]:
+    return [{k: v for k, v in r.items() if k not in _STATIC_HOUSE_COLUMNS} for r in rows]
+
+async def _chart_payload(
+    geo: GeoOut, jd_ut: float, HSYS: bytes, ai: int,
+    house_systems: Optional[str] = None, fields: Optional[List[str]] = None,
+) -> dict:
+    """
+    fields 為 None 時輸出完整內容；否則只執行所選欄位需要的 builder，houses_rows 也省略靜態說明。
+    星盤與表格在執行緒池中計算；ai=1 時四個短解讀與長篇建議同時向 LLM 發出。
+    """
+    systems = _parse_house_systems(HSYS, house_systems)
+    want = set(fields) if fields is not None else set(CHART_FIELDS + TABLE_FIELDS + EXTRA_FIELDS)
+    table_fields = [f for f in TABLE_FIELDS if f in want]
+    if house_systems and "systems" in want:
+        table_fields += [f for f in ("four_kings", "houses_rows", "positions_rows") if f not in table_fields]
+    charts = await run_in_threadpool(cached_charts, jd_ut, geo.lat, geo.lon, systems, table_fields)
+    data, tables = charts[0]
+    lean = fields is not None
+
+    use_ai = GEMINI_ENABLED and ai == 1
+    want_interp = use_ai and "four_kings" in want
+    want_advice = use_ai and "ai_advice_md" in want
+    interp: dict = {}
+    ai_advice_md = ""
+    missing = None
+    library = get_library() if ai == 1 and "four_kings" in want else None
+    if library is not None:
+        # 有預先生成的解讀庫時四王解讀查表（不需要 API 金鑰）；象限宮位制下命主星掌管的宮位
+        # 可能與解讀庫的整宮制不同，這類項目不由解讀庫提供，只對缺少的項目呼叫 LLM
+        interp = library.interpretations(data)
+        missing = [k for k in interpretation_prompts(data) if k not in interp]
+        want_interp = want_interp and bool(missing)
+    if want_interp or want_advice:
+        house_sum = summarize_house_focus(data) if want_advice else ""
+        aspect_sum = summarize_major_aspects(data, rows=tables.get("aspects_rows")) if want_advice else ""
+        generated, ai_advice_md = await generate_ai_content(
+            data, GEMINI_ENABLED, house_sum, aspect_sum, interpretations=want_interp, advice=want_advice,
+            labels=missing,
+        )
+        interp = {**generated, **interp}
+    if interp:
+        four_rows, _ = build_four_kings(data, interpretations=interp)
+        tables = {**tables, "four_kings": four_rows}
+
+    payload = {
+        "geo": geo.dict(),
+        **{k: data[k] for k in CHART_FIELDS[1:]},
+        **{k: tables[k] for k in TABLE_FIELDS if k in tables},
+    }
+    if lean and "houses_rows" in payload:
+        payload["houses_rows"] = _lean_houses(payload["houses_rows"])
+    if "symbols" in want:
+        payload["symbols"] = SYMBOL
+    if "house_system_cn" in want:
+        payload["house_system_cn"] = HOUSE_SYSTEMS_CODE2CN.get(HSYS, "整宮制")
+    if "ai_advice_md" in want:
+        payload["ai_advice_md"] = ai_advice_md
+    if "rag_active" in want:
+        payload["rag_active"] = (await run_in_threadpool(get_retriever, GEMINI_ENABLED)) is not None
+    if house_systems and "systems" in want:
+        payload["systems"] = [
+            {
+                "house_system": code.decode("ascii"),
+                "house_system_cn": HOUSE_SYSTEMS_CODE2CN.get(code, ""),
+                "asc": d["asc"],
+                "mc": d["mc"],
+                "cusps": d["cusps"],
+                "planet_houses": d["planet_houses"],
+                "four_kings": t["four_kings"],
+                "houses_rows": _lean_houses(t["houses_rows"]) if lean else t["houses_rows"],
+                "positions_rows": t["positions_rows"],
+            }
+            for code, (d, t) in zip(systems, charts)
+        ]
+    if "credits_md" in want:
+        payload["credits_md"] = build_credits_md(geo.tz)
+    if "ai_generated" in want:
+        payload["ai_generated"] = bool(ai)
+    if lean:
+        payload = {k: v for k, v in payload.items() if k in want}
+    return payload
+
 @app.get("/api/chart")
-def api_chart(
+async def api_chart(
     year: int,
     month: int,
     day: int,
@@ -72,53 +265,251 @@ def api_chart(
     minute: int,
     location: str,
     house_system: str = Query("整宮制", description="中文名稱或代碼，例如：整宮制 / W"),
-    ai: int = Query(0, ge=0, le=1, description="是否產生AI解說內容 : 1=是, 0=否")
+    house_systems: Optional[str] = Query(None, description="同時比較的其他宮位制，以逗號分隔，例如：P,K,W"),
+    ai: int = Query(0, ge=0, le=1, description="是否產生AI解說內容 : 1=是, 0=否"),
+    fields: Optional[str] = Query(None, description="只回傳指定欄位，以逗號分隔，例如：wheel 或 wheel,aspects_rows；未指定時回傳全部"),
 ):
-    geo = geocode_location(location)
+    selected = _parse_fields(fields)
+    geo = await run_in_threadpool(geocode_location, location)
     jd_ut = to_julday_utc(
         ChartInput(year=year, month=month, day=day, hour=hour, minute=minute, location=location),
         geo.tz,
     )
+    payload = await _chart_payload(geo, jd_ut, resolve_hsys(house_system), ai, house_systems, selected)
+    return FastJSONResponse(payload)
+
+@app.get("/api/chart/coords")
+async def api_chart_coords(
+    year: int,
+    month: int,
+    day: int,
+    hour: int,
+    minute: int,
+    lat: float = Query(..., ge=-90, le=90, description="緯度（北緯為正）"),
+    lon: float = Query(..., ge=-180, le=180, description="經度（東經為正）"),
+    tz: str = Query(..., description="IANA 時區，例如：Asia/Taipei"),
+    house_system: str = Query("整宮制", description="中文名稱或代碼，例如：整宮制 / W"),
+    house_systems: Optional[str] = Query(None, description="同時比較的其他宮位制，以逗號分隔，例如：P,K,W"),
+    ai: int = Query(0, ge=0, le=1, description="是否產生AI解說內容 : 1=是, 0=否"),
+    fields: Optional[str] = Query(None, description="只回傳指定欄位，以逗號分隔，例如：wheel 或 wheel,aspects_rows；未指定時回傳全部"),
+):
+    if tz not in pytz.all_timezones_set:
+        raise HTTPException(status_code=400, detail=f"未知的時區：{tz}")
+    selected = _parse_fields(fields)
+    geo = GeoOut(lat=lat, lon=lon, tz=tz)
+    jd_ut = to_julday_utc(
+        ChartInput(year=year, month=month, day=day, hour=hour, minute=minute, location=f"{lat},{lon}"),
+        tz,
+    )
+    payload = await _chart_payload(geo, jd_ut, resolve_hsys(house_system), ai, house_systems, selected)
+    return FastJSONResponse(payload)
+
+def _sse(event: str, body) -> str:
+    return f"event: {event}\ndata: {dumps(body).decode('utf-8')}\n\n"
+
+@app.get("/api/chart/advice/stream")
+async def api_chart_advice_stream(
+    year: int,
+    month: int,
+    day: int,
+    hour: int,
+    minute: int,
+    location: Optional[str] = Query(None, description="出生地；或改用 lat / lon / tz"),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    tz: Optional[str] = Query(None, description="IANA 時區，例如：Asia/Taipei"),
+    house_system: str = Query("整宮制", description="中文名稱或代碼，例如：整宮制 / W"),
+    fields: Optional[str] = Query(None, description="tables 事件的欄位，格式同 /api/chart"),
+):
+    """
+    以 Server-Sent Events 串流 AI 建議：先送 tables（星盤與表格，同 /api/chart 不含 AI），
+    再送 context（檢索到的知識庫片段摘要），接著逐段送 token，最後 done 附完整 Markdown。
+    """
+    selected = _parse_fields(fields)
+    birth = {"year": year, "month": month, "day": day, "hour": hour, "minute": minute,
+             "location": location, "lat": lat, "lon": lon, "tz": tz}
+    try:
+        inp, geo = await run_in_threadpool(resolve_birth_record, birth)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    jd_ut = to_julday_utc(inp, geo.tz)
     HSYS = resolve_hsys(house_system)
-    data = calc_chart(jd_ut, geo.lat, geo.lon, HSYS)
-
-    interp = gemini_interpretations(data, GEMINI_ENABLED) if (GEMINI_ENABLED and ai == 1) else {}
-    four_rows, chart_ruler = build_four_kings(data, interpretations=interp)
-    detail_rows, summary_rows = build_element_tables(data, chart_ruler)
-    houses_rows = build_houses_table(data)
-    positions_rows = build_positions_table(data)
-    aspects_rows = build_aspects_table(data)
-    
-    ai_advice_md = ""
-    if GEMINI_ENABLED and ai == 1:
+
+    async def events():
+        payload = await _chart_payload(geo, jd_ut, HSYS, 0, fields=selected)
+        yield _sse("tables", payload)
+        data, tables = await run_in_threadpool(cached_chart, jd_ut, geo.lat, geo.lon, HSYS, ())
         house_sum = summarize_house_focus(data)
-        aspect_sum = summarize_major_aspects(data)
-        ai_advice_md = build_ai_advice_md(data, GEMINI_ENABLED, house_sum, aspect_sum)
+        aspect_sum = summarize_major_aspects(data, rows=tables.get("aspects_rows"))
+        async for event, body in stream_ai_advice(data, GEMINI_ENABLED, house_sum, aspect_sum):
+            yield _sse(event, body)
 
-    payload = {
-        "geo": geo.dict(),
-        "asc": data["asc"],
-        "mc": data["mc"],
-        "asc_sign": data["asc_sign"],
-        "mc_sign": data["mc_sign"],
-        "cusps": data["cusps"],
-        "planet_lons": data["planet_lons"],
-        "planet_signs": data["planet_signs"],
-        "planet_houses": data["planet_houses"],
-        "north_node": data["north_node"],
-        "south_node": data["south_node"],
-        "four_kings": four_rows,
-        "chart_ruler": chart_ruler,
-        "detail_rows": detail_rows,
-        "summary_rows": summary_rows,
-        "houses_rows": houses_rows,
-        "positions_rows": positions_rows,
-        "aspects_rows": aspects_rows,
-        "symbols": SYMBOL,
-        "house_system_cn": HOUSE_SYSTEMS_CODE2CN.get(HSYS, "整宮制"),
-        "ai_advice_md": ai_advice_md,
-        "rag_active": get_retriever(GEMINI_ENABLED) is not None,
-    }
-    payload["credits_md"] = build_credits_md(geo.tz)
-    payload["ai_generated"] = bool(ai)
-    return payload
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/api/chart/bulk")
+async def api_chart_bulk(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv 或 ndjson；未指定時依 Content-Type 判斷"),
+    house_system: str = Query("整宮制", description="未在紀錄中指定時使用的宮位制"),
+    tables: int = Query(0, ge=0, le=1, description="是否一併輸出各表格 : 1=是, 0=否"),
+):
+    """
+    上傳 CSV 或 NDJSON 出生資料（欄位：year, month, day, hour, minute，
+    以及 location 或 lat / lon / tz，可選 id、house_system），以 NDJSON 逐筆串流回傳星盤。
+    """
+    fmt = (format or "").lower()
+    if not fmt:
+        ctype = request.headers.get("content-type", "")
+        fmt = "csv" if "csv" in ctype else "ndjson"
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format 須為 csv 或 ndjson")
+    upload = await spool_upload(request.stream())
+    return StreamingResponse(
+        stream_bulk_charts(upload, fmt, resolve_hsys(house_system), tables == 1),
+        media_type="application/x-ndjson",
+    )
+
+@app.post("/api/synastry")
+def api_synastry(req: SynastryRequest):
+    """雙人合盤：兩人的星盤、交叉相位矩陣與互相的宮位疊加。"""
+    try:
+        return synastry_payload(req)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/composite")
+def api_composite(req: SynastryRequest):
+    """中點組合盤。"""
+    try:
+        return composite_payload(req)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/synastry/match")
+def api_synastry_match(req: MatchRequest):
+    """一對多配對評分，依分數由高到低回傳（top_n 可只取前幾名）。"""
+    if len(req.candidates) > max_candidates():
+        raise HTTPException(status_code=400, detail=f"候選人數超過上限 {max_candidates()}")
+    try:
+        return match_payload(req)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/transits")
+def api_transits(
+    year: int,
+    month: int,
+    day: int,
+    hour: int,
+    minute: int,
+    location: Optional[str] = Query(None, description="出生地；或改用 lat / lon / tz"),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    tz: Optional[str] = Query(None, description="IANA 時區，例如：Asia/Taipei"),
+    start: Optional[str] = Query(None, description="起始日 YYYY-MM-DD，預設今天"),
+    days: int = Query(365, ge=1, description="搜尋天數"),
+    kinds: Optional[str] = Query(None, description="aspect, ingress, station，以逗號分隔；預設全部"),
+    bodies: Optional[str] = Query(None, description="推運行星，以逗號分隔；預設全部"),
+):
+    """
+    推運事件搜尋：行運行星與本命點的精準相位、換星座與停滯轉向，
+    依時間順序以 NDJSON 串流輸出（每 30 天一段，先算好的先送出）。
+    """
+    if days > max_transit_days():
+        raise HTTPException(status_code=400, detail=f"days 超過上限 {max_transit_days()}")
+    birth = {"year": year, "month": month, "day": day, "hour": hour, "minute": minute,
+             "location": location, "lat": lat, "lon": lon, "tz": tz}
+    try:
+        kind_list = parse_list(kinds, EVENT_KINDS, "事件類型")
+        body_list = parse_list(bodies, PLANET_POINTS, "行星")
+        geo, _, natal = natal_for(birth)
+        start_jd = parse_start(start, geo.tz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        stream_transits(natal, start_jd, start_jd + days, kind_list, body_list, tzname=geo.tz),
+        media_type="application/x-ndjson",
+    )
+
+@app.get("/api/transits/calendar")
+def api_transits_calendar(
+    year: int,
+    month: int,
+    day: int,
+    hour: int,
+    minute: int,
+    location: Optional[str] = Query(None, description="出生地；或改用 lat / lon / tz"),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    tz: Optional[str] = Query(None, description="IANA 時區，例如：Asia/Taipei"),
+    start: Optional[str] = Query(None, description="起始月份 YYYY-MM，預設本月"),
+    months: int = Query(12, ge=1, le=36, description="月數"),
+    kinds: Optional[str] = Query(None, description="aspect, ingress, station，以逗號分隔；預設全部"),
+    bodies: Optional[str] = Query(None, description="推運行星，以逗號分隔；預設全部"),
+    format: str = Query("ndjson", description="ndjson 或 sse"),
+):
+    """
+    逐月推運行事曆：每個月一行（NDJSON）或一個 month 事件（SSE），第一個月算完即送出。
+    本命盤與各月頁面皆有快取。
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format 須為 ndjson 或 sse")
+    birth = {"year": year, "month": month, "day": day, "hour": hour, "minute": minute,
+             "location": location, "lat": lat, "lon": lon, "tz": tz}
+    try:
+        kind_list = parse_list(kinds, EVENT_KINDS, "事件類型")
+        body_list = parse_list(bodies, PLANET_POINTS, "行星")
+        geo, jd_ut, natal = natal_for(birth)
+        y, m = parse_month(start, geo.tz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        stream_calendar(natal, natal_cache_key(geo, jd_ut), y, m, months, geo.tz,
+                        kind_list, body_list, sse=format == "sse"),
+        media_type="text/event-stream" if format == "sse" else "application/x-ndjson",
+    )
+
+@app.post("/api/rectify")
+def api_rectify(req: RectifyRequest):
+    """
+    出生時間校正：給定出生日期、地點與條件（例如上升獅子、月亮第 10 宮），
+    回傳當天所有條件同時成立的時段，兩端精確到秒。
+    """
+    try:
+        return rectify_payload(req)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/patterns")
+def api_patterns(
+    pattern: str = Query(..., description="grand_trine（大三角）、t_square（T 三角）或 stellium（群星）"),
+    start: str = Query(..., description="起始日 YYYY-MM-DD（UTC）"),
+    end: str = Query(..., description="結束日 YYYY-MM-DD（UTC，不含）"),
+    element: Optional[str] = Query(None, description="大三角限定元素：火 / 地 / 風 / 水"),
+    min_count: int = Query(4, ge=2, description="群星最少天體數"),
+    bodies: Optional[str] = Query(None, description="參與的天體，以逗號分隔；預設為月亮以外的行星"),
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="指定地點時群星以宮位判斷"),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    tz: Optional[str] = Query(None, description="輸出時間所用的 IANA 時區；預設 UTC"),
+    house_system: str = Query("整宮制", description="宮位群星使用的宮位制"),
+):
+    """
+    在一段期間內搜尋大三角、T 三角或群星，回傳合併後的時段與參與的天體。
+    """
+    if pattern not in PATTERNS:
+        raise HTTPException(status_code=400, detail=f"pattern 須為 {' / '.join(PATTERNS)}")
+    if tz and tz not in pytz.all_timezones_set:
+        raise HTTPException(status_code=400, detail=f"未知的時區：{tz}")
+    if (lat is None) != (lon is None):
+        raise HTTPException(status_code=400, detail="lat 與 lon 須同時提供")
+    location = (lat, lon, resolve_hsys(house_system)) if lat is not None else None
+    try:
+        body_list = parse_list(bodies, PLANET_POINTS, "行星") if bodies else [p for p in PLANET_POINTS if p != "月亮"]
+        return patterns_payload(pattern, start, end, body_list, element, min_count, location, tz)
+    except SampleLimitExceeded as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Dict, List, Optional
 
 class ChartInput(BaseModel):
@@ -13,3 +13,58 @@ class GeoOut(BaseModel):
     lat: float
     lon: float
     tz: str
+
+class BirthData(BaseModel):
+    year: int
+    month: int
+    day: int
+    hour: int
+    minute: int
+    location: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    tz: Optional[str] = None
+
+class SynastryRequest(BaseModel):
+    a: BirthData
+    b: BirthData
+    house_system: str = "整宮制"
+
+class MatchCandidate(BaseModel):
+    id: Optional[str] = None
+    # 已存好的行星黃經可直接提供，否則依出生日期時間計算：需 year～minute 與 tz，
+    # 沒有 tz 時改以 location 查詢時區；lat / lon 不會用到（評分不含宮位）
+    planet_lons: Optional[Dict[str, float]] = None
+    year: Optional[int] = None
+    month: Optional[int] = None
+    day: Optional[int] = None
+    hour: Optional[int] = None
+    minute: Optional[int] = None
+    location: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    tz: Optional[str] = None
+
+class MatchRequest(BaseModel):
+    subject: BirthData
+    candidates: List[MatchCandidate]
+    top_n: Optional[int] = Field(None, ge=1)
+
+class RectifyConstraint(BaseModel):
+    point: str  # 上升、天頂、行星或交點
+    sign: Optional[str] = None
+    house: Optional[int] = None
+
+class RectifyRequest(BaseModel):
+    year: int
+    month: int
+    day: int
+    location: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    tz: Optional[str] = None
+    house_system: str = "整宮制"
+    constraints: List[RectifyConstraint]
+    start_hour: float = 0.0  # 搜尋範圍（當地時間，小時）
+    end_hour: float = 24.0
+    step_minutes: float = 2.0
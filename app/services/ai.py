@@ -1,53 +1,101 @@
 import os
+import json
+import asyncio
+import logging
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
 import google.generativeai as genai
-from typing import Dict, Optional
+
 from ..constants import RULER_OF_SIGN
 from ..core.astrology import deg_to_sign
+from .llm_cache import get_llm_cache, prompt_fingerprint
 from .rag import get_retriever
 
-def gemini_interpretations(data: dict, gemini_enabled: bool) -> Dict[str, str]:
-    if not gemini_enabled:
-        return {}
-        
-    model = genai.GenerativeModel("gemini-2.5-flash")
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "gemini-2.5-flash"
+SYSTEM_MSG = "你是精通西洋占星的中文助理，提供務實且尊重自由意志的解讀。務必使用繁體中文。"
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def call_timeout() -> float:
+    """單次 LLM 呼叫的逾時（秒）。"""
+    return _env_float("AI_CALL_TIMEOUT", 25.0)
+
+
+def request_deadline() -> float:
+    """一個請求內所有 AI 呼叫共用的期限（秒）。"""
+    return _env_float("AI_REQUEST_DEADLINE", 40.0)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # SDK 為同步呼叫，放到獨立執行緒池，不佔用 FastAPI 的預設執行緒池
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=int(_env_float("AI_MAX_CONCURRENCY", 32)), thread_name_prefix="ai"
+        )
+    return _executor
+
+
+def sun_prompt(sign: str, house: int) -> str:
+    return f"用繁體中文50字說明：太陽在{sign}座，第{house}宮，性格與生命能量的核心表現與課題。"
+
+
+def moon_prompt(sign: str, house: int) -> str:
+    return f"用繁體中文50字說明：月亮在{sign}座，第{house}宮，情緒需求與安全感來源的表現。"
+
+
+def asc_prompt(sign: str) -> str:
+    return f"用繁體中文50字說明：上升在{sign}座，外在形象、互動風格與他人第一印象。"
+
+
+def ruler_prompt(chart_ruler: str, sign: str, house: int, houses_ruled: List[int]) -> str:
+    ruled_str = "、".join(f"第{h}宮" for h in houses_ruled) if houses_ruled else "—"
+    return (
+        f"用繁體中文50字說明：命主星{chart_ruler}在{sign}座，第{house}宮，掌管{ruled_str}；"
+        f"交代其對人格傾向、行動路徑與生命方向的影響重點。"
+    )
+
+
+def chart_ruled_houses(data: dict) -> List[int]:
+    """命主星掌管的宮位：宮首星座由命主星守護的宮（依星盤實際的宮首，象限宮位制下可能與整宮制不同）。"""
+    chart_ruler = RULER_OF_SIGN[data["asc_sign"]]
+    return [i + 1 for i, c in enumerate(data["cusps"]) if RULER_OF_SIGN[deg_to_sign(c)] == chart_ruler]
+
+
+def interpretation_prompts(data: dict) -> Dict[str, str]:
+    """四王（太陽、月亮、上升、命主星）的短解讀提示詞，鍵即 build_four_kings 的項目名稱。"""
     asc_sign = data["asc_sign"]
     chart_ruler = RULER_OF_SIGN[asc_sign]
     pr_sign = data["planet_signs"].get(chart_ruler, "")
     pr_house = data["planet_houses"].get(chart_ruler, 0)
+    houses_ruled = chart_ruled_houses(data)
 
-    cusp_signs = [deg_to_sign(c) for c in data["cusps"]]
-    houses_ruled = [i+1 for i, s in enumerate(cusp_signs) if RULER_OF_SIGN[s] == chart_ruler]
-    ruled_str = "、".join(f"第{h}宮" for h in houses_ruled) if houses_ruled else "—"
-
-    prompts = {
-        "太陽": f"用繁體中文50字說明：太陽在{data['planet_signs']['太陽']}座，第{data['planet_houses']['太陽']}宮，性格與生命能量的核心表現與課題。",
-        "月亮": f"用繁體中文50字說明：月亮在{data['planet_signs']['月亮']}座，第{data['planet_houses']['月亮']}宮，情緒需求與安全感來源的表現。",
-        "上升": f"用繁體中文50字說明：上升在{data['asc_sign']}座，外在形象、互動風格與他人第一印象。",
-        f"命主星({chart_ruler})": (
-            f"用繁體中文50字說明：命主星{chart_ruler}在{pr_sign}座，第{pr_house}宮，掌管{ruled_str}；"
-            f"交代其對人格傾向、行動路徑與生命方向的影響重點。"
-        ),
+    return {
+        "太陽": sun_prompt(data["planet_signs"]["太陽"], data["planet_houses"]["太陽"]),
+        "月亮": moon_prompt(data["planet_signs"]["月亮"], data["planet_houses"]["月亮"]),
+        "上升": asc_prompt(asc_sign),
+        f"命主星({chart_ruler})": ruler_prompt(chart_ruler, pr_sign, pr_house, houses_ruled),
     }
 
-    out: Dict[str, str] = {}
-    for k, p in prompts.items():
-        try:
-            r = model.generate_content(p)
-            out[k] = r.text.strip()
-        except Exception:
-            out[k] = ""
-    return out
-
-def build_ai_advice_md(data: dict, gemini_enabled: bool, house_summary: str, aspect_summary: str) -> str:
-    if not gemini_enabled:
-        return ""
 
+def advice_prompt(data: dict, house_summary: str, aspect_summary: str) -> str:
     sun = f"{data['planet_signs']['太陽']}座 第{data['planet_houses']['太陽']}宮"
     moon = f"{data['planet_signs']['月亮']}座 第{data['planet_houses']['月亮']}宮"
     asc  = f"{data['asc_sign']}座"
 
-    prompt = f"""
+    return f"""
 你是一位專業占星解讀者。請根據以下出生星盤重點，撰寫約 400–600 字的務實分析（避免宿命論）：
 - 太陽：{sun}
 - 月亮：{moon}
@@ -60,33 +108,417 @@ def build_ai_advice_md(data: dict, gemini_enabled: bool, house_summary: str, asp
 請使用 Markdown 呈現，包含小標題與條列清單。
 """.strip()
 
-    system_msg = "你是精通西洋占星的中文助理，提供務實且尊重自由意志的解讀。務必使用繁體中文。"
-    
+
+def advice_system_instruction(context_text: Optional[str]) -> str:
+    if not context_text:
+        return SYSTEM_MSG
+    return SYSTEM_MSG + f"\n\n請根據以下提供的占星學知識庫內容輔助分析：\n\n{context_text}"
+
+
+def retrieve_docs(prompt: str, gemini_enabled: bool) -> Optional[List]:
+    """RAG 檢索；沒有知識庫時回傳 None。"""
     retriever = get_retriever(gemini_enabled)
-    if retriever:
+    if not retriever:
+        return None
+    return retriever.invoke(prompt)
+
+
+def generate_text(
+    prompt: str, system_instruction: Optional[str] = None, timeout: Optional[float] = None,
+    cache_key: Optional[str] = None, use_cache: bool = True,
+) -> str:
+    """
+    單次生成，先查 LLM 快取；未指定 cache_key 時以 (模型, system instruction, 提示詞) 的指紋為鍵。
+    相同的星座 × 宮位組合不論哪位使用者，都只呼叫一次模型。use_cache=False 時不查也不寫快取。
+    """
+    cache = get_llm_cache()
+    key = cache_key or prompt_fingerprint(MODEL_NAME, prompt, system_instruction)
+    if use_cache:
+        text = cache.get(key)
+        if text is not None:
+            return text
+    model = genai.GenerativeModel(MODEL_NAME, system_instruction=system_instruction)
+    r = model.generate_content(prompt, request_options={"timeout": timeout} if timeout else None)
+    text = (r.text or "").strip()
+    if use_cache:
+        cache.put(key, MODEL_NAME, text)
+    return text
+
+
+def advice_cache_key(prompt: str, rag: bool) -> str:
+    """
+    長篇建議的快取鍵：提示詞本身就是摘要後的特徵（日月升、落宮與相位摘要），
+    知識庫內容由提示詞檢索而來，只需區分是否使用 RAG，查快取時不必先做檢索。
+    rag 為知識庫是否已設定（cached_advice 的回傳值），查詢與寫入都用同一個鍵。
+    """
+    return prompt_fingerprint(MODEL_NAME, prompt, SYSTEM_MSG + ("\n[rag]" if rag else ""))
+
+
+def cacheable_advice(rag: Optional[bool], used_context: bool) -> bool:
+    """
+    只有實際是否帶入知識庫與設定一致時才寫入快取：知識庫已設定但檢索失敗的降級結果不快取，
+    否則會存到查詢時不會用到的鍵，之後每次都重新呼叫模型。rag 為 None（查快取失敗）時也不寫入。
+    """
+    return rag is not None and rag == used_context
+
+
+def cached_advice(prompt: str, gemini_enabled: bool) -> Tuple[bool, Optional[str]]:
+    """回傳 (是否使用 RAG, 快取中的建議)。"""
+    rag = get_retriever(gemini_enabled) is not None
+    return rag, get_llm_cache().get(advice_cache_key(prompt, rag))
+
+
+def stream_text(prompt: str, system_instruction: Optional[str] = None, timeout: Optional[float] = None) -> Iterator[str]:
+    """generate_text 的串流版，逐段產出模型輸出的文字。"""
+    model = genai.GenerativeModel(MODEL_NAME, system_instruction=system_instruction)
+    response = model.generate_content(
+        prompt, stream=True, request_options={"timeout": timeout} if timeout else None
+    )
+    for chunk in response:
+        text = chunk.text
+        if text:
+            yield text
+
+
+def context_metadata(docs: Optional[List]) -> List[dict]:
+    """檢索結果的摘要（來源、頁碼、字數），不含全文。"""
+    return [
+        {
+            "source": (doc.metadata or {}).get("source"),
+            "page": (doc.metadata or {}).get("page"),
+            "chars": len(doc.page_content),
+        }
+        for doc in docs or []
+    ]
+
+
+def gemini_interpretations(data: dict, gemini_enabled: bool) -> Dict[str, str]:
+    if not gemini_enabled:
+        return {}
+
+    out: Dict[str, str] = {}
+    for k, p in interpretation_prompts(data).items():
         try:
-            docs = retriever.invoke(prompt)
+            out[k] = generate_text(p)
+        except Exception:
+            out[k] = ""
+    return out
+
+def build_ai_advice_md(data: dict, gemini_enabled: bool, house_summary: str, aspect_summary: str) -> str:
+    if not gemini_enabled:
+        return ""
+
+    prompt = advice_prompt(data, house_summary, aspect_summary)
+    rag, text = cached_advice(prompt, gemini_enabled)
+    if text is not None:
+        return text
+    key = advice_cache_key(prompt, rag)
+    try:
+        docs = retrieve_docs(prompt, gemini_enabled)
+        if docs is not None:
             context_text = "\n\n".join([doc.page_content for doc in docs])
-            
-            model_name = "gemini-2.5-flash"
-            llm = genai.GenerativeModel(
-                model_name,
-                system_instruction=system_msg + f"\n\n請根據以下提供的占星學知識庫內容輔助分析：\n\n{context_text}"
+            return generate_text(
+                prompt, advice_system_instruction(context_text), cache_key=key,
+                use_cache=cacheable_advice(rag, True),
             )
-            r = llm.generate_content(prompt)
-            return (r.text or "").strip()
-        except Exception as e:
-            print(f"RAG Generation failed: {e}")
-            traceback.print_exc()
+    except Exception as e:
+        print(f"RAG Generation failed: {e}")
+        traceback.print_exc()
 
     try:
-        model = genai.GenerativeModel("gemini-2.5-flash", system_instruction=system_msg)
-        r = model.generate_content(prompt)
-        return (r.text or "").strip()
+        return generate_text(prompt, SYSTEM_MSG, cache_key=key, use_cache=cacheable_advice(rag, False))
     except Exception as e:
         print(f"Gemini API Error: {e}")
         return ""
 
+
+async def _run_until(deadline: float, label: str, fn, *args):
+    """
+    在 AI 執行緒池中執行 fn，逾時上限為 AI_CALL_TIMEOUT 與共用期限剩餘時間的較小者。
+    逾時拋出 asyncio.TimeoutError（執行緒本身由 SDK 的 request timeout 收尾）。
+    """
+    loop = asyncio.get_running_loop()
+    budget = min(call_timeout(), deadline - loop.time())
+    if budget <= 0:
+        raise asyncio.TimeoutError
+    try:
+        return await asyncio.wait_for(loop.run_in_executor(_get_executor(), fn, *args), budget)
+    except asyncio.TimeoutError:
+        logger.warning(f"AI call '{label}' timed out after {budget:.1f}s.")
+        raise
+
+
+async def _generate_or_empty(
+    deadline: float, label: str, prompt: str, system_instruction: Optional[str] = None,
+    cache_key: Optional[str] = None, use_cache: bool = True,
+) -> str:
+    loop = asyncio.get_running_loop()
+    timeout = min(call_timeout(), deadline - loop.time())
+    try:
+        return await _run_until(
+            deadline, label, generate_text, prompt, system_instruction, timeout, cache_key, use_cache,
+        )
+    except asyncio.TimeoutError:
+        return ""
+    except Exception as e:
+        logger.warning(f"AI call '{label}' failed: {e}")
+        return ""
+
+
+async def agemini_interpretations(
+    data: dict, gemini_enabled: bool, deadline: float, labels: Optional[Sequence[str]] = None,
+) -> Dict[str, str]:
+    """
+    gemini_interpretations 的非同步版：四個提示詞同時送出，失敗或逾時的項目為空字串。
+    labels 指定時只生成這些項目（其餘已由解讀庫提供）。
+    """
+    if not gemini_enabled:
+        return {}
+    prompts = interpretation_prompts(data)
+    if labels is not None:
+        prompts = {k: p for k, p in prompts.items() if k in labels}
+    texts = await asyncio.gather(*(_generate_or_empty(deadline, k, p) for k, p in prompts.items()))
+    return dict(zip(prompts, texts))
+
+
+async def abuild_ai_advice_md(
+    data: dict, gemini_enabled: bool, house_summary: str, aspect_summary: str, deadline: float,
+) -> str:
+    """build_ai_advice_md 的非同步版：檢索失敗或逾時就不帶知識庫內容直接生成。"""
+    if not gemini_enabled:
+        return ""
+    prompt = advice_prompt(data, house_summary, aspect_summary)
+    rag: Optional[bool] = None
+    try:
+        rag, text = await _run_until(deadline, "cache", cached_advice, prompt, gemini_enabled)
+    except Exception as e:
+        logger.warning(f"LLM cache lookup failed: {e!r}")
+        text = None
+    if text is not None:
+        return text
+    context_text = None
+    try:
+        docs = await _run_until(deadline, "retrieval", retrieve_docs, prompt, gemini_enabled)
+        if docs is not None:
+            context_text = "\n\n".join([doc.page_content for doc in docs])
+    except Exception as e:
+        logger.warning(f"RAG retrieval failed, generating without context: {e!r}")
+    return await _generate_or_empty(
+        deadline, "advice", prompt, advice_system_instruction(context_text),
+        advice_cache_key(prompt, bool(rag)), cacheable_advice(rag, context_text is not None),
+    )
+
+
+async def stream_ai_advice(
+    data: dict, gemini_enabled: bool, house_summary: str, aspect_summary: str,
+) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    以 build_ai_advice_md 相同的提示詞串流生成建議，依序產出 (事件, 內容)：
+    context（檢索到的知識庫片段摘要）→ 多個 token → done（完整 Markdown）；出錯時為 error。
+    每段輸出都受 AI_CALL_TIMEOUT 與 AI_REQUEST_DEADLINE 限制。
+    """
+    if not gemini_enabled:
+        yield "error", {"detail": "AI 未啟用"}
+        return
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + request_deadline()
+    prompt = advice_prompt(data, house_summary, aspect_summary)
+
+    rag: Optional[bool] = None
+    try:
+        rag, cached = await _run_until(deadline, "cache", cached_advice, prompt, gemini_enabled)
+    except Exception as e:
+        logger.warning(f"LLM cache lookup failed: {e!r}")
+        cached = None
+    if cached is not None:
+        # 快取命中：不檢索、不呼叫模型，整段一次送出
+        yield "context", {"rag_active": rag, "docs": [], "cached": True}
+        yield "token", {"text": cached}
+        yield "done", {"ai_advice_md": cached}
+        return
+
+    docs = None
+    try:
+        docs = await _run_until(deadline, "retrieval", retrieve_docs, prompt, gemini_enabled)
+    except Exception as e:
+        logger.warning(f"RAG retrieval failed, generating without context: {e!r}")
+    yield "context", {"rag_active": docs is not None, "docs": context_metadata(docs), "cached": False}
+
+    context_text = "\n\n".join([doc.page_content for doc in docs]) if docs is not None else None
+    timeout = min(call_timeout(), deadline - loop.time())
+    parts: List[str] = []
+    complete = False
+    try:
+        chunks = stream_text(prompt, advice_system_instruction(context_text), timeout)
+        while True:
+            text = await _run_until(deadline, "advice", next, chunks, None)
+            if text is None:
+                break
+            parts.append(text)
+            yield "token", {"text": text}
+        complete = True
+    except Exception as e:
+        logger.warning(f"AI advice stream stopped: {e!r}")
+        yield "error", {"detail": "AI 生成逾時或失敗"}
+    advice_md = "".join(parts).strip()
+    if complete and cacheable_advice(rag, docs is not None):
+        get_llm_cache().put(advice_cache_key(prompt, rag), MODEL_NAME, advice_md)
+    yield "done", {"ai_advice_md": advice_md}
+
+
+# 單次結構化生成：四王短解讀與長篇建議放在同一個提示詞，以 JSON schema 約束回應格式
+STRUCTURED_KEYS = ("sun", "moon", "asc", "ruler", "advice_md")
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {k: {"type": "string"} for k in STRUCTURED_KEYS},
+    "required": list(STRUCTURED_KEYS),
+}
+
+
+def structured_mode() -> bool:
+    """AI_STRUCTURED=1 時，ai=1 的四個短解讀與建議合併成一次 LLM 呼叫。"""
+    return os.getenv("AI_STRUCTURED", "0").strip() == "1"
+
+
+def structured_prompt(data: dict, house_summary: str, aspect_summary: str) -> Tuple[str, Dict[str, str]]:
+    """回傳 (合併後的提示詞, JSON 欄位 → build_four_kings 項目名稱)。各段要求沿用原本的提示詞。"""
+    prompts = interpretation_prompts(data)
+    labels = dict(zip(STRUCTURED_KEYS, prompts))
+    tasks = "\n".join(f"- {key}：{prompts[label]}" for key, label in labels.items())
+    prompt = f"""
+請一次完成以下各項，並以 JSON 物件回傳，欄位名稱如下：
+{tasks}
+- advice_md：依下列要求撰寫 Markdown 長文。
+
+{advice_prompt(data, house_summary, aspect_summary)}
+""".strip()
+    return prompt, labels
+
+
+def parse_structured(text: str) -> Dict[str, str]:
+    """解析並驗證結構化回應，只保留型別正確且非空白的欄位；整段無法解析時回傳空 dict。"""
+    try:
+        obj = json.loads(text)
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(obj, dict):
+        return {}
+    return {k: obj[k].strip() for k in STRUCTURED_KEYS if isinstance(obj.get(k), str) and obj[k].strip()}
+
+
+def generate_structured(
+    prompt: str, system_instruction: Optional[str], timeout: Optional[float], cache_key: str,
+    use_cache: bool = True,
+) -> Dict[str, str]:
+    """以 JSON schema 生成並解析；只有全部欄位都通過驗證時才寫入 LLM 快取。"""
+    cache = get_llm_cache()
+    text = cache.get(cache_key) if use_cache else None
+    if text is not None:
+        return parse_structured(text)
+    model = genai.GenerativeModel(
+        MODEL_NAME,
+        system_instruction=system_instruction,
+        generation_config={"response_mime_type": "application/json", "response_schema": RESPONSE_SCHEMA},
+    )
+    r = model.generate_content(prompt, request_options={"timeout": timeout} if timeout else None)
+    text = (r.text or "").strip()
+    fields = parse_structured(text)
+    if use_cache and len(fields) == len(STRUCTURED_KEYS):
+        cache.put(cache_key, MODEL_NAME, text)
+    return fields
+
+
+async def agenerate_structured(
+    data: dict, gemini_enabled: bool, house_summary: str, aspect_summary: str, deadline: float,
+) -> Tuple[Dict[str, str], str]:
+    """
+    一次呼叫取得四王解讀與建議。知識庫內容只檢索一次、放進 system instruction；
+    回應中缺少或格式不符的欄位，各自退回原本的單獨生成（仍受同一期限限制）。
+    """
+    prompt, labels = structured_prompt(data, house_summary, aspect_summary)
+
+    def key_for(rag: bool) -> str:
+        return prompt_fingerprint(MODEL_NAME + ":json", prompt, SYSTEM_MSG + ("\n[rag]" if rag else ""))
+
+    def cached() -> Tuple[bool, Optional[str]]:
+        rag = get_retriever(gemini_enabled) is not None
+        return rag, get_llm_cache().get(key_for(rag))
+
+    fields: Dict[str, str] = {}
+    rag: Optional[bool] = None
+    try:
+        rag, text = await _run_until(deadline, "cache", cached)
+        if text is not None:
+            fields = parse_structured(text)
+    except Exception as e:
+        logger.warning(f"LLM cache lookup failed: {e!r}")
+
+    if not fields:
+        context_text = None
+        try:
+            docs = await _run_until(
+                deadline, "retrieval", retrieve_docs, advice_prompt(data, house_summary, aspect_summary), gemini_enabled
+            )
+            if docs is not None:
+                context_text = "\n\n".join([doc.page_content for doc in docs])
+        except Exception as e:
+            logger.warning(f"RAG retrieval failed, generating without context: {e!r}")
+        loop = asyncio.get_running_loop()
+        timeout = min(call_timeout(), deadline - loop.time())
+        try:
+            fields = await _run_until(
+                deadline, "structured", generate_structured, prompt, advice_system_instruction(context_text),
+                timeout, key_for(bool(rag)), cacheable_advice(rag, context_text is not None),
+            )
+        except Exception as e:
+            logger.warning(f"Structured AI call failed, falling back per field: {e!r}")
+            fields = {}
+
+    missing = [k for k in STRUCTURED_KEYS if k not in fields]
+    if missing:
+        logger.info(f"Structured response missing {missing}; generating them separately.")
+        prompts = interpretation_prompts(data)
+        fallbacks = await asyncio.gather(*(
+            abuild_ai_advice_md(data, gemini_enabled, house_summary, aspect_summary, deadline)
+            if k == "advice_md" else _generate_or_empty(deadline, labels[k], prompts[labels[k]])
+            for k in missing
+        ))
+        fields.update({k: v for k, v in zip(missing, fallbacks) if v})
+
+    interp = {label: fields.get(k, "") for k, label in labels.items()}
+    return interp, fields.get("advice_md", "")
+
+
+async def generate_ai_content(
+    data: dict,
+    gemini_enabled: bool,
+    house_summary: str,
+    aspect_summary: str,
+    interpretations: bool = True,
+    advice: bool = True,
+    labels: Optional[Sequence[str]] = None,
+) -> Tuple[Dict[str, str], str]:
+    """
+    四個短解讀與長篇建議同時進行，整體受 AI_REQUEST_DEADLINE 限制，
+    延遲約等於最慢的單一呼叫。兩者都需要且 AI_STRUCTURED=1 時改為單次結構化呼叫。
+    labels 指定時只生成其中的四王項目（不走結構化呼叫）。回傳 (interpretations, ai_advice_md)。
+    """
+    if not gemini_enabled:
+        return {}, ""
+    deadline = asyncio.get_running_loop().time() + request_deadline()
+    if interpretations and advice and labels is None and structured_mode():
+        return await agenerate_structured(data, gemini_enabled, house_summary, aspect_summary, deadline)
+
+    async def nothing(default):
+        return default
+
+    interp, advice_md = await asyncio.gather(
+        agemini_interpretations(data, gemini_enabled, deadline, labels) if interpretations else nothing({}),
+        abuild_ai_advice_md(data, gemini_enabled, house_summary, aspect_summary, deadline)
+        if advice else nothing(""),
+    )
+    return interp, advice_md
+
 def build_credits_md(tz: str) -> str:
     return f"""
     ## 🙏 引用與致謝
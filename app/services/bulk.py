@@ -0,0 +1,170 @@
+import csv
+import json
+import logging
+import tempfile
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import pytz
+from starlette.concurrency import run_in_threadpool
+
+from ..schemas import ChartInput, GeoOut
+from ..core.geocoder import geocode_location, to_julday_utc_batch
+from ..core.astrology import calc_chart, resolve_hsys
+from ..core.batch import calc_charts_batch
+from ..utils.formatters import build_chart_tables
+
+logger = logging.getLogger(__name__)
+
+BULK_CHUNK_SIZE = 256
+_TIME_FIELDS = ("year", "month", "day", "hour", "minute")
+
+
+async def spool_upload(stream: AsyncIterator[bytes], max_memory: int = 8 * 1024 * 1024) -> BinaryIO:
+    """
+    先把上傳內容寫入暫存檔（小檔留在記憶體），再開始串流輸出。
+    StreamingResponse 開始送出後會搶讀 receive() 偵測斷線，不能邊讀請求邊回應。
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    async for chunk in stream:
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+def iter_records(f: BinaryIO, fmt: str) -> Iterator[dict]:
+    """
+    逐行解析出生資料。fmt="csv" 時第一行為欄位名稱（不支援欄位內換行）；
+    fmt="ndjson" 時每行一個 JSON 物件。無法解析的行以 {"_error": ...} 回報。
+    """
+    header: Optional[List[str]] = None
+    for raw in f:
+        line = raw.decode("utf-8-sig").strip()
+        if not line:
+            continue
+        if fmt == "csv":
+            cells = next(csv.reader([line]))
+            if header is None:
+                header = [c.strip() for c in cells]
+                continue
+            yield dict(zip(header, (c.strip() for c in cells)))
+        else:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {"_error": f"JSON 格式錯誤：{e.msg}"}
+                continue
+            yield rec if isinstance(rec, dict) else {"_error": "每行須為 JSON 物件"}
+
+
+def _birth_time(rec: dict) -> dict:
+    if "_error" in rec:
+        raise ValueError(rec["_error"])
+    for k in _TIME_FIELDS:
+        if rec.get(k) is None or (isinstance(rec[k], str) and not rec[k].strip()):
+            raise ValueError(f"缺少欄位 {k}")
+    try:
+        t = {k: int(rec[k]) for k in _TIME_FIELDS}
+    except (TypeError, ValueError):
+        raise ValueError("日期時間欄位須為整數")
+    datetime(t["year"], t["month"], t["day"], t["hour"], t["minute"])
+    return t
+
+
+def _check_tz(tz: str) -> str:
+    if tz not in pytz.all_timezones_set:
+        raise ValueError(f"未知的時區：{tz or '（空白）'}")
+    return tz
+
+
+def resolve_birth_record(rec: dict) -> Tuple[ChartInput, GeoOut]:
+    t = _birth_time(rec)
+    location = str(rec.get("location") or "").strip()
+    if rec.get("lat") not in (None, "") and rec.get("lon") not in (None, ""):
+        tz = _check_tz(str(rec.get("tz") or "").strip())
+        geo = GeoOut(lat=float(rec["lat"]), lon=float(rec["lon"]), tz=tz)
+    elif location:
+        geo = geocode_location(location)
+    else:
+        raise ValueError("需提供 location 或 lat / lon / tz")
+    return ChartInput(location=location, **t), geo
+
+
+def resolve_birth_time(rec: dict) -> Tuple[ChartInput, str]:
+    """只需換算儒略日時使用（不算宮位）：有 tz 直接採用，不做地理編碼；沒有 tz 才由 location 查詢時區。"""
+    t = _birth_time(rec)
+    location = str(rec.get("location") or "").strip()
+    tz = str(rec.get("tz") or "").strip()
+    if tz:
+        tz = _check_tz(tz)
+    elif location:
+        tz = geocode_location(location).tz
+    else:
+        raise ValueError("需提供 tz 或 location")
+    return ChartInput(location=location, **t), tz
+
+
+def compute_chunk(
+    chunk: List[Tuple[int, dict]], default_hsys: bytes, tables: bool
+) -> List[str]:
+    """計算一批紀錄並回傳 NDJSON 行；儒略日以 to_julday_utc_batch 一次換算，星盤交給 calc_charts_batch 分散計算。"""
+    out: Dict[int, dict] = {}
+    ok: List[Tuple[int, dict, ChartInput, GeoOut]] = []
+    for idx, rec in chunk:
+        try:
+            inp, geo = resolve_birth_record(rec)
+            ok.append((idx, rec, inp, geo))
+        except Exception as e:
+            out[idx] = {"index": idx, "id": rec.get("id"), "error": str(e)}
+
+    if ok:
+        jds = to_julday_utc_batch([r[2] for r in ok], [r[3].tz for r in ok])
+        tasks = [
+            (float(jd_ut), geo.lat, geo.lon,
+             resolve_hsys(rec["house_system"]) if rec.get("house_system") else default_hsys)
+            for (_, rec, _, geo), jd_ut in zip(ok, jds)
+        ]
+        try:
+            charts = calc_charts_batch(tasks)
+        except Exception as e:
+            logger.warning(f"Bulk batch failed, retrying record by record: {e}")
+            charts = []
+            for t in tasks:
+                try:
+                    charts.append(calc_chart(*t))
+                except Exception as err:
+                    charts.append(err)
+
+        for (idx, rec, _, geo), task, data in zip(ok, tasks, charts):
+            if isinstance(data, Exception):
+                out[idx] = {"index": idx, "id": rec.get("id"), "error": str(data)}
+                continue
+            row = {"index": idx, "id": rec.get("id"), "geo": geo.dict(), "jd_ut": task[0], **data}
+            if tables:
+                row.update(build_chart_tables(data))
+            out[idx] = row
+
+    return [json.dumps(out[idx], ensure_ascii=False) + "\n" for idx, _ in chunk]
+
+
+async def stream_bulk_charts(
+    f: BinaryIO,
+    fmt: str,
+    default_hsys: bytes,
+    tables: bool = False,
+    chunk_size: int = BULK_CHUNK_SIZE,
+) -> AsyncIterator[str]:
+    """每累積 chunk_size 筆就在執行緒池中計算並立即輸出結果，記憶體只保留一批。"""
+    chunk: List[Tuple[int, dict]] = []
+    idx = 0
+    for rec in iter_records(f, fmt):
+        chunk.append((idx, rec))
+        idx += 1
+        if len(chunk) >= chunk_size:
+            for line in await run_in_threadpool(compute_chunk, chunk, default_hsys, tables):
+                yield line
+            chunk = []
+    if chunk:
+        for line in await run_in_threadpool(compute_chunk, chunk, default_hsys, tables):
+            yield line
+    f.close()
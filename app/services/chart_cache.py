@@ -0,0 +1,66 @@
+import os
+import logging
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from ..core.astrology import calc_chart_multi
+from ..utils.cache import LRUCache
+from ..utils.formatters import TABLE_FIELDS, build_chart_tables
+from ..utils.jsonfast import dumps
+
+logger = logging.getLogger(__name__)
+
+_cache: Optional[LRUCache] = None
+
+
+def _payload_bytes(value) -> int:
+    # 以 JSON 長度估計佔用量，只在寫入時計算一次
+    return len(dumps(value))
+
+
+def get_chart_cache() -> LRUCache:
+    global _cache
+    if _cache is None:
+        _cache = LRUCache(
+            maxsize=int(os.getenv("CHART_CACHE_SIZE", "2048") or 2048),
+            max_bytes=int(float(os.getenv("CHART_CACHE_MAX_MB", "64") or 64) * 1024 * 1024),
+            sizeof=_payload_bytes,
+        )
+    return _cache
+
+
+def chart_key(jd_ut: float, lat: float, lon: float, HSYS: bytes) -> Tuple[int, int, int, bytes]:
+    """儒略日取到秒、經緯度取到 1e-4 度（約 11 公尺），同一張盤的不同請求共用同一個鍵。"""
+    return (round(jd_ut * 86400.0), round(lat * 1e4), round(lon * 1e4), HSYS)
+
+
+def cached_chart(
+    jd_ut: float, lat: float, lon: float, HSYS: bytes, fields: Optional[Iterable[str]] = None,
+) -> Tuple[dict, dict]:
+    """
+    回傳 (calc_chart 結果, build_chart_tables 結果)。命中時完全跳過 Swiss Ephemeris 與各表格的計算。
+    fields 為需要的表格（預設全部），快取中缺少的表格才補算。回傳的物件為快取共用，呼叫端不可修改。
+    """
+    return cached_charts(jd_ut, lat, lon, [HSYS], fields)[0]
+
+
+def cached_charts(
+    jd_ut: float, lat: float, lon: float, systems: Sequence[bytes], fields: Optional[Iterable[str]] = None,
+) -> List[Tuple[dict, dict]]:
+    """多個宮位制版本的 cached_chart：未命中的宮位制以 calc_chart_multi 一次算完。"""
+    want = TABLE_FIELDS if fields is None else tuple(fields)
+    cache = get_chart_cache()
+    keys = [chart_key(jd_ut, lat, lon, h) for h in systems]
+    entries = [cache.get(k) for k in keys]
+    missing = [i for i, e in enumerate(entries) if e is None]
+    if missing:
+        charts = calc_chart_multi(jd_ut, lat, lon, [systems[i] for i in missing])
+        for i, data in zip(missing, charts):
+            entries[i] = (data, build_chart_tables(data, fields=want))
+            cache.put(keys[i], entries[i])
+    for i, (data, tables) in enumerate(entries):
+        lacking = [f for f in want if f not in tables]
+        if lacking:
+            # 之前只算了部分表格：補齊後以新物件寫回，讓快取重新估計大小
+            entries[i] = (data, {**tables, **build_chart_tables(data, fields=lacking)})
+            cache.put(keys[i], entries[i])
+    return entries
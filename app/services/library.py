@@ -0,0 +1,227 @@
+import os
+import json
+import mmap
+import struct
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from ..constants import RULER_OF_SIGN, ZODIAC_CN
+from .ai import MODEL_NAME, asc_prompt, chart_ruled_houses, moon_prompt, ruler_prompt, sun_prompt
+
+logger = logging.getLogger(__name__)
+
+# 檔案格式：
+#   檔頭 32 位元組：魔數、格式版本、筆數、提示詞集合指紋（16 位元組）
+#   索引 count × (offset u32, length u32)：以 entry_id 直接定位，length 為 0 表示尚未生成
+#   內容：UTF-8 文字依序串接
+MAGIC = b"ASTROLIB"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sII16s")
+_SLOT = struct.Struct("<II")
+
+# entry_id 配置：太陽 / 月亮各 12 星座 × 12 宮，上升 12 星座，
+# 命主星依上升星座（決定命主星與整宮制下掌管的宮位）× 所在星座 × 所在宮位
+_SUN, _MOON, _ASC, _RULER = 0, 144, 288, 300
+COUNT = _RULER + 12 * 12 * 12
+
+
+def ruled_houses(asc_sign: str) -> List[int]:
+    """整宮制下命主星掌管的宮位（第 1 宮必在其中）。"""
+    ruler = RULER_OF_SIGN[asc_sign]
+    a = ZODIAC_CN.index(asc_sign)
+    return [h for h in range(1, 13) if RULER_OF_SIGN[ZODIAC_CN[(a + h - 1) % 12]] == ruler]
+
+
+def iter_entries() -> Iterator[Tuple[int, str]]:
+    """所有 (entry_id, 提示詞)，提示詞與 app/services/ai.py 的即時生成完全相同。"""
+    for s, sign in enumerate(ZODIAC_CN):
+        for h in range(1, 13):
+            yield _SUN + s * 12 + h - 1, sun_prompt(sign, h)
+            yield _MOON + s * 12 + h - 1, moon_prompt(sign, h)
+    for a, asc in enumerate(ZODIAC_CN):
+        yield _ASC + a, asc_prompt(asc)
+    for a, asc in enumerate(ZODIAC_CN):
+        ruler, ruled = RULER_OF_SIGN[asc], ruled_houses(asc)
+        for s, sign in enumerate(ZODIAC_CN):
+            for h in range(1, 13):
+                yield _RULER + (a * 12 + s) * 12 + h - 1, ruler_prompt(ruler, sign, h, ruled)
+
+
+def prompt_set_digest() -> bytes:
+    """模型名稱與所有提示詞的指紋；提示詞改版後舊的解讀庫自動失效。"""
+    h = hashlib.sha256(MODEL_NAME.encode("utf-8"))
+    for _, prompt in iter_entries():
+        h.update(prompt.encode("utf-8"))
+        h.update(b"\0")
+    return h.digest()[:16]
+
+
+def entry_ids(data: dict) -> Dict[str, int]:
+    """
+    calc_chart 結果 → 四王各項目的 entry_id，鍵與 build_four_kings 的項目名稱相同。
+    命主星的解讀依整宮制寫入掌管的宮位；星盤實際宮首（象限宮位制）推得的掌管宮位不同時不列入，
+    由呼叫端改以 LLM 即時生成。
+    """
+    signs, houses = data["planet_signs"], data["planet_houses"]
+    asc = data["asc_sign"]
+    ruler = RULER_OF_SIGN[asc]
+    a = ZODIAC_CN.index(asc)
+    ids = {
+        "太陽": _SUN + ZODIAC_CN.index(signs["太陽"]) * 12 + houses["太陽"] - 1,
+        "月亮": _MOON + ZODIAC_CN.index(signs["月亮"]) * 12 + houses["月亮"] - 1,
+        "上升": _ASC + a,
+    }
+    if chart_ruled_houses(data) == ruled_houses(asc):
+        ids[f"命主星({ruler})"] = _RULER + (a * 12 + ZODIAC_CN.index(signs[ruler])) * 12 + houses[ruler] - 1
+    return ids
+
+
+class InterpretationLibrary:
+    """唯讀的解讀庫：整個檔案以 mmap 映射，依 entry_id 直接讀取索引與內容，O(1) 查詢。"""
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, digest = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or count != COUNT:
+            raise ValueError(f"解讀庫格式不符：{path}")
+        self.digest = digest
+        self._data_start = _HEADER.size + COUNT * _SLOT.size
+
+    def get(self, entry_id: int) -> str:
+        offset, length = _SLOT.unpack_from(self._mm, _HEADER.size + entry_id * _SLOT.size)
+        if not length:
+            return ""
+        start = self._data_start + offset
+        return self._mm[start:start + length].decode("utf-8")
+
+    def interpretations(self, data: dict) -> Dict[str, str]:
+        """解讀庫能正確提供的項目；不在結果中的項目（見 entry_ids）需另外生成。"""
+        return {label: self.get(i) for label, i in entry_ids(data).items()}
+
+    def missing(self) -> int:
+        return sum(
+            1 for i in range(COUNT) if not _SLOT.unpack_from(self._mm, _HEADER.size + i * _SLOT.size)[1]
+        )
+
+
+def write_library(path: str, texts: Dict[int, str], digest: bytes) -> None:
+    """寫入暫存檔後原子替換，讀取中的行程仍持有舊檔的映射。"""
+    slots, blobs, offset = [], [], 0
+    for i in range(COUNT):
+        b = (texts.get(i) or "").encode("utf-8")
+        slots.append(_SLOT.pack(offset, len(b)))
+        blobs.append(b)
+        offset += len(b)
+    tmp = path + ".tmp"
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, COUNT, digest))
+        f.write(b"".join(slots))
+        f.write(b"".join(blobs))
+    os.replace(tmp, path)
+
+
+def load_progress(path: str, digest: bytes) -> Dict[int, str]:
+    """
+    讀回已完成的項目：先取同版本解讀庫中的內容，再疊上 <path>.progress.jsonl 的逐筆紀錄。
+    提示詞集合指紋不同的舊資料一律捨棄。
+    """
+    texts: Dict[int, str] = {}
+    if os.path.exists(path):
+        try:
+            lib = InterpretationLibrary(path)
+            if lib.digest == digest:
+                texts.update({i: t for i in range(COUNT) if (t := lib.get(i))})
+        except ValueError as e:
+            logger.warning(f"Ignoring existing library: {e}")
+    progress = path + ".progress.jsonl"
+    if os.path.exists(progress):
+        with open(progress, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 中斷時最後一行可能不完整
+                if rec.get("digest") == digest.hex() and rec.get("text"):
+                    texts[int(rec["id"])] = rec["text"]
+    return texts
+
+
+def build_library(
+    path: str,
+    generate: Callable[[str], str],
+    workers: int = 4,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[int, int]:
+    """
+    逐筆生成尚未完成的項目（generate 自行負責限流），每完成一筆立即追加到 progress 檔，
+    中斷後重跑會從進度接續。全部結束後寫出解讀庫並刪除 progress 檔。回傳 (已完成, 總數)。
+    """
+    digest = prompt_set_digest()
+    texts = load_progress(path, digest)
+    todo = [(i, p) for i, p in iter_entries() if i not in texts]
+    progress = path + ".progress.jsonl"
+    lock = threading.Lock()
+    f = None
+
+    def run(item: Tuple[int, str]) -> None:
+        i, prompt = item
+        try:
+            text = generate(prompt)
+        except Exception as e:
+            logger.warning(f"Entry {i} failed: {e}")
+            return
+        if not text:
+            return
+        with lock:
+            texts[i] = text
+            f.write(json.dumps({"id": i, "digest": digest.hex(), "text": text}, ensure_ascii=False) + "\n")
+            f.flush()
+            if on_progress:
+                on_progress(len(texts), COUNT)
+
+    if todo:
+        folder = os.path.dirname(progress)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(progress, "a", encoding="utf-8") as f, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for fut in as_completed([pool.submit(run, item) for item in todo]):
+                fut.result()
+
+    write_library(path, texts, digest)
+    if len(texts) == COUNT and os.path.exists(progress):
+        os.remove(progress)
+    return len(texts), COUNT
+
+
+_library: Optional[InterpretationLibrary] = None
+_library_checked = False
+_library_lock = threading.Lock()
+
+
+def get_library() -> Optional[InterpretationLibrary]:
+    """INTERPRETATION_LIBRARY 指向的解讀庫；未設定、檔案不存在或提示詞已改版時回傳 None。"""
+    global _library, _library_checked
+    with _library_lock:
+        if not _library_checked:
+            _library_checked = True
+            path = os.getenv("INTERPRETATION_LIBRARY", "").strip()
+            if path and os.path.exists(path):
+                try:
+                    lib = InterpretationLibrary(path)
+                    if lib.digest != prompt_set_digest():
+                        logger.warning(f"Interpretation library {path} was built from different prompts; ignoring it.")
+                    else:
+                        _library = lib
+                        logger.info(f"Interpretation library loaded from {path} ({COUNT - lib.missing()}/{COUNT} entries).")
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Interpretation library disabled: {e}")
+            elif path:
+                logger.warning(f"Interpretation library not found at '{path}'.")
+        return _library
@@ -0,0 +1,166 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from typing import Any, Dict, Optional
+
+from ..utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(text: str) -> str:
+    """提示詞正規化：全形轉半形、合併空白，排版差異不影響快取鍵。"""
+    return _WS_RE.sub(" ", unicodedata.normalize("NFKC", text or "")).strip()
+
+
+def prompt_fingerprint(model: str, prompt: str, system_instruction: Optional[str] = None) -> str:
+    """以模型名稱與正規化後的 system instruction、提示詞計算內容定址鍵。"""
+    h = hashlib.sha256()
+    for part in (model, normalize_prompt(system_instruction or ""), normalize_prompt(prompt)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class LLMCache:
+    """
+    LLM 回應快取：行程內 LRU + SQLite 磁碟儲存，以 prompt_fingerprint 為鍵。
+    磁碟層依 accessed_at 做 LRU，總大小（回應文字的 UTF-8 位元組）超過 max_bytes 時從最久未用的開始刪除。
+    """
+    def __init__(self, db_path: Optional[str], memory_size: int = 1024, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max(0, int(max_bytes))
+        self.memory = LRUCache(maxsize=memory_size)
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._bytes = 0
+        if db_path:
+            try:
+                folder = os.path.dirname(db_path)
+                if folder:
+                    os.makedirs(folder, exist_ok=True)
+                self._conn = sqlite3.connect(db_path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    " key TEXT PRIMARY KEY,"
+                    " model TEXT NOT NULL,"
+                    " text TEXT NOT NULL,"
+                    " bytes INTEGER NOT NULL,"
+                    " created_at REAL NOT NULL,"
+                    " accessed_at REAL NOT NULL)"
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed_at)"
+                )
+                self._conn.commit()
+                self._bytes = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM llm_cache").fetchone()[0]
+            except sqlite3.Error as e:
+                logger.warning(f"LLM disk cache disabled ({db_path}): {e}")
+                self._conn = None
+
+    def get(self, key: str) -> Optional[str]:
+        text = self.memory.get(key)
+        if text is not None:
+            return text
+        if self._conn is None:
+            return None
+        with self._lock:
+            try:
+                row = self._conn.execute("SELECT text FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key)
+                    )
+                    self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM disk cache read failed: {e}")
+                row = None
+            if not row:
+                self.disk_misses += 1
+                return None
+            self.disk_hits += 1
+        self.memory.put(key, row[0])
+        return row[0]
+
+    def put(self, key: str, model: str, text: str) -> None:
+        """只快取非空的回應；失敗或逾時的空字串不寫入。"""
+        if not text:
+            return
+        self.memory.put(key, text)
+        if self._conn is None:
+            return
+        size = len(text.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            try:
+                old = self._conn.execute("SELECT bytes FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, model, text, bytes, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, text, size, now, now),
+                )
+                self._bytes += size - (old[0] if old else 0)
+                if self.max_bytes and self._bytes > self.max_bytes:
+                    self._evict()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM disk cache write failed: {e}")
+
+    def _evict(self) -> None:
+        # 呼叫端需持有 self._lock；刪到總量降至上限的 90%，避免每次寫入都觸發
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute("SELECT key, bytes FROM llm_cache ORDER BY accessed_at").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self._bytes <= target:
+                break
+            doomed.append((key,))
+            self._bytes -= size
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        disk_rows = None
+        if self._conn is not None:
+            with self._lock:
+                try:
+                    disk_rows = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+        return {
+            "memory": self.memory.stats(),
+            "disk": {
+                "enabled": self._conn is not None,
+                "size": disk_rows,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.disk_hits,
+                "misses": self.disk_misses,
+            },
+        }
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            db_path = os.getenv("LLM_CACHE_PATH", "./cache/llm.sqlite3").strip()
+            _cache = LLMCache(
+                db_path=db_path or None,
+                memory_size=int(os.getenv("LLM_CACHE_MEMORY_SIZE", "1024") or 1024),
+                max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "256") or 256) * 1024 * 1024),
+            )
+        return _cache
@@ -0,0 +1,80 @@
+import os
+import logging
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+import pytz
+import swisseph as swe
+
+from ..core.ephemeris import get_ephemeris_table
+from ..core.patterns import search_patterns
+from ..core.transits import jd_to_datetime
+
+logger = logging.getLogger(__name__)
+
+
+def max_pattern_samples(start_jd: float, end_jd: float) -> int:
+    """
+    星曆表涵蓋整段期間時上限為 PATTERN_MAX_SAMPLES；否則每次取樣都要逐點呼叫 Swiss Ephemeris
+    （約慢 30 倍），改用 PATTERN_MAX_SAMPLES_SWE。
+    """
+    table = get_ephemeris_table()
+    if table is not None and table.covers(start_jd) and table.covers(end_jd):
+        name, default = "PATTERN_MAX_SAMPLES", 400000
+    else:
+        name, default = "PATTERN_MAX_SAMPLES_SWE", 20000
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _utc_jd(text: str, label: str) -> float:
+    try:
+        d = datetime.strptime(text, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"{label} 格式須為 YYYY-MM-DD")
+    return swe.julday(d.year, d.month, d.day, 0.0)
+
+
+def patterns_payload(
+    pattern: str,
+    start: str,
+    end: str,
+    bodies: Sequence[str],
+    element: Optional[str] = None,
+    min_count: int = 4,
+    location: Optional[Tuple[float, float, bytes]] = None,
+    tzname: Optional[str] = None,
+) -> dict:
+    """
+    搜尋 [start, end)（UTC 日期）內的星象組合，回傳合併後的區間。
+    總取樣數（含宮位群星的細部取樣）超過 max_pattern_samples 時丟出 SampleLimitExceeded。
+    """
+    start_jd, end_jd = _utc_jd(start, "start"), _utc_jd(end, "end")
+    if end_jd <= start_jd:
+        raise ValueError("end 須晚於 start")
+
+    local = pytz.timezone(tzname) if tzname else None
+
+    def fmt(jd: float) -> str:
+        dt = jd_to_datetime(jd)
+        if local is not None:
+            return dt.astimezone(local).strftime("%Y-%m-%d %H:%M")
+        return dt.strftime("%Y-%m-%dT%H:%MZ")
+
+    found = search_patterns(
+        pattern, start_jd, end_jd, bodies, element, min_count, location, max_samples=max_pattern_samples(start_jd, end_jd),
+    )
+    intervals = [
+        {
+            "start": fmt(r["start_jd"]),
+            "end": fmt(r["end_jd"]),
+            "days": round(r["end_jd"] - r["start_jd"], 3),
+            "bodies": r["bodies"],
+            "start_jd": r["start_jd"],
+            "end_jd": r["end_jd"],
+        }
+        for r in found
+    ]
+    return {"pattern": pattern, "count": len(intervals), "intervals": intervals}
@@ -0,0 +1,60 @@
+import logging
+from datetime import datetime, timedelta
+
+import pytz
+
+from ..constants import HOUSE_SYSTEMS_CODE2CN
+from ..schemas import ChartInput, RectifyRequest
+from ..core.astrology import resolve_hsys
+from ..core.geocoder import to_julday_utc
+from ..core.rectify import rectify
+from ..core.transits import jd_to_datetime
+from .bulk import resolve_birth_record
+
+logger = logging.getLogger(__name__)
+
+
+def _local_hour_jd(inp: ChartInput, hours: float, tzname: str) -> float:
+    """
+    出生當天當地時間 hours 時（24 即隔日 0 時）→ UTC 儒略日。
+    逐一換算實際的時、分，DST 切換日（一天 23 或 25 小時）的時段邊界仍對應當地鐘面時間。
+    """
+    total = hours * 60.0
+    whole = int(total)
+    dt = datetime(inp.year, inp.month, inp.day) + timedelta(minutes=whole)
+    edge = ChartInput(
+        year=dt.year, month=dt.month, day=dt.day, hour=dt.hour, minute=dt.minute, location=inp.location,
+    )
+    return to_julday_utc(edge, tzname) + (total - whole) / 1440.0
+
+
+def rectify_payload(req: RectifyRequest) -> dict:
+    """出生時間校正：回傳當天（start_hour–end_hour，當地時間）所有條件同時成立的時段。"""
+    if not 0.0 <= req.start_hour < req.end_hour <= 24.0:
+        raise ValueError("start_hour / end_hour 須介於 0–24 且 start_hour < end_hour")
+    if not 0.1 <= req.step_minutes <= 30.0:
+        raise ValueError("step_minutes 須介於 0.1–30")
+    birth = req.dict(include={"year", "month", "day", "location", "lat", "lon", "tz"})
+    inp, geo = resolve_birth_record({**birth, "hour": 0, "minute": 0})
+    HSYS = resolve_hsys(req.house_system)
+    constraints = [(c.point, c.sign, c.house) for c in req.constraints]
+    intervals = rectify(
+        _local_hour_jd(inp, req.start_hour, geo.tz), _local_hour_jd(inp, req.end_hour, geo.tz),
+        geo.lat, geo.lon, HSYS, constraints, req.step_minutes,
+    )
+
+    tz = pytz.timezone(geo.tz)
+
+    def local(jd: float) -> str:
+        return jd_to_datetime(jd).astimezone(tz).strftime("%Y-%m-%d %H:%M:%S")
+
+    rows = [
+        {"start": local(a), "end": local(b), "start_jd": a, "end_jd": b, "minutes": round((b - a) * 1440.0, 2)}
+        for a, b in intervals
+    ]
+    return {
+        "geo": geo.dict(),
+        "house_system_cn": HOUSE_SYSTEMS_CODE2CN.get(HSYS, "整宮制"),
+        "intervals": rows,
+        "total_minutes": round(sum(r["minutes"] for r in rows), 2),
+    }
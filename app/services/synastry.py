@@ -0,0 +1,111 @@
+import os
+import logging
+from typing import List, Tuple
+
+import numpy as np
+
+from ..constants import HOUSE_SYSTEMS_CODE2CN
+from ..schemas import BirthData, GeoOut, MatchRequest, SynastryRequest
+from ..core.astrology import resolve_hsys
+from ..core.aspects import ASPECT_CONFIG, PLANET_POINTS, point_lons
+from ..core.ephemeris import positions_array
+from ..core.geocoder import to_julday_utc, to_julday_utc_batch
+from ..core.synastry import composite_chart, cross_aspects, house_overlays, score_many, top_matches
+from ..utils.formatters import build_chart_tables
+from .bulk import resolve_birth_record, resolve_birth_time
+from .chart_cache import cached_chart
+
+logger = logging.getLogger(__name__)
+
+
+def max_candidates() -> int:
+    try:
+        return int(os.getenv("MATCH_MAX_CANDIDATES", "10000"))
+    except ValueError:
+        return 10000
+
+
+def resolve_birth(birth: BirthData) -> Tuple[GeoOut, float]:
+    inp, geo = resolve_birth_record(birth.dict())
+    return geo, to_julday_utc(inp, geo.tz)
+
+
+def _person(geo: GeoOut, jd_ut: float, data: dict) -> dict:
+    return {"geo": geo.dict(), "jd_ut": jd_ut, **data}
+
+
+def synastry_payload(req: SynastryRequest) -> dict:
+    """雙人合盤：兩張盤各自走 cached_chart，交叉相位與宮位疊加各一次向量運算。"""
+    HSYS = resolve_hsys(req.house_system)
+    geo_a, jd_a = resolve_birth(req.a)
+    geo_b, jd_b = resolve_birth(req.b)
+    data_a, _ = cached_chart(jd_a, geo_a.lat, geo_a.lon, HSYS, fields=())
+    data_b, _ = cached_chart(jd_b, geo_b.lat, geo_b.lon, HSYS, fields=())
+    _, aspects = ASPECT_CONFIG
+    return {
+        "a": _person(geo_a, jd_a, data_a),
+        "b": _person(geo_b, jd_b, data_b),
+        "house_system_cn": HOUSE_SYSTEMS_CODE2CN.get(HSYS, "整宮制"),
+        "cross_aspects": cross_aspects(data_a, data_b, aspects),
+        "overlays": {
+            "a_in_b": house_overlays(data_b, data_a),
+            "b_in_a": house_overlays(data_a, data_b),
+        },
+    }
+
+
+def composite_payload(req: SynastryRequest) -> dict:
+    """中點組合盤，附上與單人星盤相同的各表格。"""
+    HSYS = resolve_hsys(req.house_system)
+    geo_a, jd_a = resolve_birth(req.a)
+    geo_b, jd_b = resolve_birth(req.b)
+    data_a, _ = cached_chart(jd_a, geo_a.lat, geo_a.lon, HSYS, fields=())
+    data_b, _ = cached_chart(jd_b, geo_b.lat, geo_b.lon, HSYS, fields=())
+    data = composite_chart(data_a, data_b, HSYS)
+    return {
+        **data,
+        **build_chart_tables(data),
+        "house_system_cn": HOUSE_SYSTEMS_CODE2CN.get(HSYS, "整宮制"),
+    }
+
+
+def match_payload(req: MatchRequest) -> dict:
+    """
+    一對多配對：候選人可直接提供 planet_lons，或提供出生日期時間與 tz（或 location）
+    由 positions_array 一次算出行星黃經。評分只用行星（候選人的出生時間與地點常不精確，
+    不比對上升 / 天頂），因此不需要經緯度，有 tz 時也不做地理編碼。
+    """
+    geo, jd_ut = resolve_birth(req.subject)
+    data, _ = cached_chart(jd_ut, geo.lat, geo.lon, resolve_hsys("整宮制"), fields=())
+    subject = point_lons(data, PLANET_POINTS)
+
+    n = len(req.candidates)
+    lons = np.full((n, len(PLANET_POINTS)), np.nan)
+    errors: List[dict] = []
+    pending: List[Tuple[int, object, str]] = []
+    for i, c in enumerate(req.candidates):
+        try:
+            if c.planet_lons is not None:
+                missing = [p for p in PLANET_POINTS if p not in c.planet_lons]
+                if missing:
+                    raise ValueError(f"planet_lons 缺少 {'、'.join(missing)}")
+                lons[i] = [c.planet_lons[p] for p in PLANET_POINTS]
+            else:
+                inp, tz = resolve_birth_time(c.dict(exclude={"id", "planet_lons"}))
+                pending.append((i, inp, tz))
+        except Exception as e:
+            errors.append({"index": i, "id": c.id, "error": str(e)})
+
+    if pending:
+        jds = to_julday_utc_batch([p[1] for p in pending], [p[2] for p in pending])
+        computed, _, _ = positions_array(jds, PLANET_POINTS)
+        lons[[p[0] for p in pending]] = computed
+
+    _, aspects = ASPECT_CONFIG
+    ok = np.nonzero(~np.isnan(lons).any(axis=1))[0]
+    scores = score_many(subject, lons[ok], aspects, PLANET_POINTS)
+    matches = [
+        {"index": int(ok[k]), "id": req.candidates[ok[k]].id, "score": round(float(scores[k]), 2)}
+        for k in top_matches(scores, req.top_n)
+    ]
+    return {"count": len(ok), "matches": matches, "errors": errors}
@@ -0,0 +1,144 @@
+import os
+import json
+import logging
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+import pytz
+import swisseph as swe
+from starlette.concurrency import run_in_threadpool
+
+from ..core.astrology import resolve_hsys
+from ..core.aspects import ASPECT_CONFIG, PLANET_POINTS
+from ..core.geocoder import to_julday_utc
+from ..core.transits import EVENT_KINDS, iter_transit_events
+from ..schemas import GeoOut
+from ..utils.cache import LRUCache
+from .bulk import resolve_birth_record
+from .chart_cache import cached_chart, chart_key
+
+logger = logging.getLogger(__name__)
+
+_calendar_cache: Optional[LRUCache] = None
+
+
+def get_calendar_cache() -> LRUCache:
+    global _calendar_cache
+    if _calendar_cache is None:
+        _calendar_cache = LRUCache(maxsize=int(os.getenv("CALENDAR_CACHE_SIZE", "1024") or 1024))
+    return _calendar_cache
+
+
+def max_transit_days() -> int:
+    try:
+        return int(float(os.getenv("TRANSIT_MAX_YEARS", "10")) * 366)
+    except ValueError:
+        return 3660
+
+
+def parse_list(text: Optional[str], allowed: Sequence[str], label: str) -> List[str]:
+    """逗號分隔的清單；空白時回傳全部，未知項目拋出 ValueError。"""
+    items = [x.strip() for x in (text or "").replace("，", ",").split(",") if x.strip()]
+    unknown = [x for x in items if x not in allowed]
+    if unknown:
+        raise ValueError(f"未知的{label}：{'、'.join(unknown)}")
+    return items or list(allowed)
+
+
+def parse_start(start: Optional[str], tzname: str) -> float:
+    """YYYY-MM-DD（以出生地時區的當日 00:00 起算），未指定時為今天。"""
+    local = pytz.timezone(tzname)
+    if start:
+        try:
+            day = datetime.strptime(start, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError("start 格式須為 YYYY-MM-DD")
+    else:
+        day = datetime.now(local).replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    dt = local.localize(day).astimezone(pytz.utc)
+    return swe.julday(dt.year, dt.month, dt.day, dt.hour + dt.minute / 60.0)
+
+
+def parse_month(month: Optional[str], tzname: str) -> Tuple[int, int]:
+    """YYYY-MM，未指定時為出生地時區的本月。"""
+    if not month:
+        now = datetime.now(pytz.timezone(tzname))
+        return now.year, now.month
+    try:
+        dt = datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise ValueError("start 格式須為 YYYY-MM")
+    return dt.year, dt.month
+
+
+def _month_start_jd(year: int, month: int, tzname: str) -> float:
+    dt = pytz.timezone(tzname).localize(datetime(year, month, 1)).astimezone(pytz.utc)
+    return swe.julday(dt.year, dt.month, dt.day, dt.hour + dt.minute / 60.0)
+
+
+def natal_for(birth: dict) -> Tuple[GeoOut, float, dict]:
+    """出生資料 → (地點, 儒略日, 本命盤)。本命盤走 chart cache，上升 / 天頂與宮位制無關，固定用整宮制。"""
+    inp, geo = resolve_birth_record(birth)
+    jd_ut = to_julday_utc(inp, geo.tz)
+    data, _ = cached_chart(jd_ut, geo.lat, geo.lon, resolve_hsys("整宮制"), fields=())
+    return geo, jd_ut, data
+
+
+async def stream_transits(
+    natal: dict,
+    start_jd: float,
+    end_jd: float,
+    kinds: Sequence[str] = EVENT_KINDS,
+    bodies: Sequence[str] = PLANET_POINTS,
+    tzname: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """每段（30 天）在執行緒池中計算，算完立即輸出該段的 NDJSON 行。"""
+    _, aspects = ASPECT_CONFIG
+    windows = iter_transit_events(natal, start_jd, end_jd, aspects, bodies, kinds, tzname=tzname)
+    while True:
+        events = await run_in_threadpool(next, windows, None)
+        if events is None:
+            break
+        for e in events:
+            yield json.dumps(e, ensure_ascii=False) + "\n"
+
+
+def calendar_month(
+    natal: dict, natal_key: tuple, year: int, month: int, tzname: str,
+    kinds: Sequence[str] = EVENT_KINDS, bodies: Sequence[str] = PLANET_POINTS,
+) -> dict:
+    """
+    單月的推運行事曆（出生地時區的月初到下個月初）。
+    以 (本命盤, 年, 月, 條件) 為鍵快取，來回翻頁不重算。
+    """
+    _, aspects = ASPECT_CONFIG
+    key = (natal_key, tzname, year, month, tuple(kinds), tuple(bodies), tuple(aspects))
+    cache = get_calendar_cache()
+    page = cache.get(key)
+    if page is None:
+        start_jd = _month_start_jd(year, month, tzname)
+        end_jd = _month_start_jd(year + month // 12, month % 12 + 1, tzname)
+        windows = iter_transit_events(natal, start_jd, end_jd, aspects, bodies, kinds,
+                                      window=end_jd - start_jd, tzname=tzname)
+        events = [e for w in windows for e in w]
+        page = {"month": f"{year:04d}-{month:02d}", "count": len(events), "events": events}
+        cache.put(key, page)
+    return page
+
+
+async def stream_calendar(
+    natal: dict, natal_key: tuple, year: int, month: int, months: int, tzname: str,
+    kinds: Sequence[str] = EVENT_KINDS, bodies: Sequence[str] = PLANET_POINTS, sse: bool = False,
+) -> AsyncIterator[str]:
+    """逐月產生行事曆頁面，算完一個月就送出一個月；sse=True 時以 Server-Sent Events 格式輸出。"""
+    for i in range(months):
+        y, m = year + (month - 1 + i) // 12, (month - 1 + i) % 12 + 1
+        page = await run_in_threadpool(calendar_month, natal, natal_key, y, m, tzname, kinds, bodies)
+        body = json.dumps(page, ensure_ascii=False)
+        yield f"event: month\ndata: {body}\n\n" if sse else body + "\n"
+    if sse:
+        yield "event: done\ndata: {}\n\n"
+
+
+def natal_cache_key(geo: GeoOut, jd_ut: float) -> tuple:
+    return chart_key(jd_ut, geo.lat, geo.lon, resolve_hsys("整宮制"))
@@ -0,0 +1,113 @@
+import time
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class QueueFullError(RuntimeError):
+    """上游請求佇列已滿或預估等待時間超過上限時拋出，呼叫端應快速失敗（例如回應 503）。"""
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    同一個 key 的並行呼叫只執行一次：第一個呼叫者實際執行 fn，
+    其餘呼叫者等待並共用其結果（或例外）。
+    """
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            if not call.event.wait(timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight call {key!r}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._calls), "executions": self.executions, "shared": self.shared}
+
+
+class TokenBucket:
+    """
+    令牌桶限流：每秒補充 rate 個令牌，最多累積 burst 個。
+    令牌不足時依到達順序預約未來的令牌並睡眠等待；
+    預估等待超過 max_wait 秒或等待中的呼叫超過 max_queue 個時立即拋出 QueueFullError。
+    """
+    def __init__(self, rate: float, burst: int = 1, max_queue: int = 32, max_wait: float = 5.0):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.max_queue = max(0, int(max_queue))
+        self.max_wait = float(max_wait)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._waiting = 0
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.rejected = 0
+
+    def acquire(self) -> float:
+        """取得一個令牌，回傳實際等待秒數。"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1.0 else (1.0 - self._tokens) / self.rate
+            if wait > 0 and (wait > self.max_wait or self._waiting >= self.max_queue):
+                self.rejected += 1
+                raise QueueFullError("上游服務忙碌中，請稍後再試", retry_after=max(1.0, wait))
+            self._tokens -= 1.0
+            self.granted += 1
+            if wait > 0:
+                self._waiting += 1
+
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "waiting": self._waiting,
+            "granted": self.granted,
+            "rejected": self.rejected,
+        }
@@ -1,11 +1,12 @@
 import math
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 from ..constants import (
     ZODIAC_CN, ELEMENT_OF_SIGN, RULER_OF_SIGN,
     SYMBOL, SCORES, ITEM_ORDER, HOUSE_NAMES,
     HOUSE_MEANINGS, essential_dignity, wrap360
 )
 from ..core.astrology import deg_to_sign
+from ..core.aspects import compute_aspects, major_kinds
 
 def deg_to_dms_in_sign(deg: float):
     d = wrap360(deg) % 30.0
@@ -190,42 +191,8 @@ def build_positions_table(data: dict):
     return rows
 
 def build_aspects_table(data: dict):
-    names = ["太陽","月亮","水星","金星","火星","木星","土星","天王星","海王星","冥王星"]
-    lons = {k: v for k, v in data["planet_lons"].items() if k in names}
-
-    aspects = [
-        ("合相", 0.0,   8.0),
-        ("三合", 120.0, 7.0),
-        ("六合", 60.0,  4.0),
-        ("刑",   90.0,  6.0),
-        ("對沖", 180.0, 8.0),
-    ]
-    kind_priority = {"合相":0, "三合":1, "六合":2, "刑":3, "對沖":4}
-
-    def sep(a, b):
-        d = abs((a % 360.0) - (b % 360.0))
-        return d if d <= 180.0 else 360.0 - d
-
-    rows = []
-    for i in range(len(names)):
-        Ai = names[i]
-        if Ai not in lons: continue
-        for j in range(i+1, len(names)):
-            Bj = names[j]
-            if Bj not in lons: continue
-            s = sep(lons[Ai], lons[Bj])
-            for kind, ang, orb in aspects:
-                diff = abs(s - ang)
-                if diff <= orb:
-                    rows.append({
-                        "組合": f"{Ai}-{Bj}",
-                        "類型": kind,
-                        "偏離角度": round(diff, 2),
-                    })
-                    break
-
-    rows.sort(key=lambda r: (kind_priority[r["類型"]], r["偏離角度"]))
-    return rows
+    """相位表：交給 core.aspects 以 NumPy 一次比對所有點對。"""
+    return compute_aspects(data)
 
 def summarize_house_focus(data: dict) -> str:
     ph = data["planet_houses"]
@@ -233,7 +200,34 @@ def summarize_house_focus(data: dict) -> str:
     parts = [f"{p}第{ph[p]}宮" for p in order if p in ph]
     return "、".join(parts)
 
-def summarize_major_aspects(data: dict, top_n: int = 8) -> str:
-    rows = build_aspects_table(data)
+def summarize_major_aspects(data: dict, top_n: int = 8, rows: Optional[List[dict]] = None) -> str:
+    """rows 傳入已算好的 aspects_rows 時直接沿用，不重算。"""
+    if rows is None:
+        rows = build_aspects_table(data)
+    major = set(major_kinds())
+    rows = [r for r in rows if r["類型"] in major]
     def fmt(r): return f"{r['組合']} {r['類型']}（Δ{r['偏離角度']}°）"
     return "、".join(map(fmt, rows[:top_n])) if rows else "無明顯主要相位"
+
+TABLE_FIELDS = (
+    "four_kings", "chart_ruler", "detail_rows", "summary_rows",
+    "houses_rows", "positions_rows", "aspects_rows",
+)
+
+def build_chart_tables(
+    data: dict, interpretations: Optional[Dict[str, str]] = None, fields: Optional[Iterable[str]] = None
+) -> dict:
+    """產生前端所需的表格；fields 指定時只執行對應的 builder（TABLE_FIELDS 的子集）。"""
+    want = set(TABLE_FIELDS if fields is None else fields)
+    tables = {}
+    if want & {"four_kings", "chart_ruler"}:
+        tables["four_kings"], tables["chart_ruler"] = build_four_kings(data, interpretations=interpretations)
+    if want & {"detail_rows", "summary_rows"}:
+        tables["detail_rows"], tables["summary_rows"] = build_element_tables(data, RULER_OF_SIGN[data["asc_sign"]])
+    if "houses_rows" in want:
+        tables["houses_rows"] = build_houses_table(data)
+    if "positions_rows" in want:
+        tables["positions_rows"] = build_positions_table(data)
+    if "aspects_rows" in want:
+        tables["aspects_rows"] = build_aspects_table(data)
+    return {k: v for k, v in tables.items() if k in want}
@@ -0,0 +1,31 @@
+import json
+import logging
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # orjson 已列為相依套件，此處僅為安全網：缺少時退回標準函式庫
+    orjson = None
+    logger.warning("orjson is not installed; JSON responses fall back to the standard library encoder.")
+
+_ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def dumps(obj: Any) -> bytes:
+    """UTF-8 JSON（中文不跳脫、無多餘空白）；有安裝 orjson 時改用 orjson。"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    以 dumps 序列化的 JSONResponse。端點直接回傳此物件時 FastAPI 不再跑 jsonable_encoder，
+    內容須為 dict / list / str / 數值等原生型別。
+    """
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
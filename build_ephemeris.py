@@ -0,0 +1,54 @@
+import os
+import time
+import argparse
+import swisseph as swe
+from dotenv import load_dotenv
+
+from app.core.ephemeris import build_table
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="預先計算行星星曆表（記憶體映射 .npy）")
+    parser.add_argument("--start", type=int, default=1900, help="起始年")
+    parser.add_argument("--end", type=int, default=2100, help="結束年（含）")
+    parser.add_argument("--step", type=float, default=1.0, help="節點間距（日）")
+    parser.add_argument("--out", default=os.getenv("EPHEMERIS_TABLE") or "./ephemeris/planets.npy")
+    args = parser.parse_args()
+
+    if os.getenv("SWEPH_PATH"):
+        swe.set_ephe_path(os.getenv("SWEPH_PATH"))
+
+    start_jd = swe.julday(args.start, 1, 1, 0.0)
+    end_jd = swe.julday(args.end + 1, 1, 1, 0.0)
+    print(f"Building ephemeris table {args.start}–{args.end}, step {args.step} day -> {args.out}")
+    t0 = time.time()
+    meta = build_table(args.out, start_jd, end_jd, step=args.step)
+    print(f"Done in {time.time() - t0:.1f}s. Error bounds (arcsec):")
+    for body, err in meta["max_error_deg"].items():
+        print(f"  {body}: {err * 3600:.4f}")
+
+    try:
+        limit = float(os.getenv("EPHEMERIS_MAX_ERROR", "5"))
+    except ValueError:
+        limit = 5.0
+    seg_days = meta["segment_steps"] * meta["step"]
+    for body, segments in meta["segment_error_deg"].items():
+        bad = [k for k, err in enumerate(segments) if err * 3600 > limit]
+        if not bad:
+            continue
+        print(f"⚠️  {body}: {len(bad)}/{len(segments)} segment(s) exceed EPHEMERIS_MAX_ERROR={limit}\" "
+              f"and will fall back to Swiss Ephemeris there:")
+        for k in bad:
+            lo = start_jd + k * seg_days
+            y0, m0, d0, _ = swe.revjul(lo)
+            y1, m1, d1, _ = swe.revjul(min(lo + seg_days, end_jd))
+            print(f"    {y0:04d}-{m0:02d}-{d0:02d} – {y1:04d}-{m1:02d}-{d1:02d}: {segments[k] * 3600:.4f}\"")
+        if len(bad) == len(segments):
+            print(f"    Consider a smaller --step to use the table for {body}.")
+    print(f"✅ Set EPHEMERIS_TABLE={args.out} to enable it.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import os
+import time
+import argparse
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.services.ai import call_timeout, generate_text  # noqa: E402
+from app.services.library import COUNT, build_library  # noqa: E402
+from app.utils.concurrency import TokenBucket  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="預先生成四王解讀庫（記憶體映射、可中斷續跑）")
+    parser.add_argument("--out", default=os.getenv("INTERPRETATION_LIBRARY") or "./library/interpretations.bin")
+    parser.add_argument("--workers", type=int, default=4, help="同時進行的 LLM 呼叫數")
+    parser.add_argument("--rate", type=float, default=1.0, help="每秒最多送出的請求數")
+    parser.add_argument("--burst", type=int, default=1)
+    args = parser.parse_args()
+
+    if not os.getenv("GEMINI_API_KEY"):
+        raise SystemExit("GEMINI_API_KEY is required to build the library.")
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+
+    bucket = TokenBucket(args.rate, burst=args.burst, max_queue=1 << 30, max_wait=float("inf"))
+    t0 = time.time()
+
+    def generate(prompt: str) -> str:
+        bucket.acquire()
+        return generate_text(prompt, timeout=call_timeout())
+
+    def report(done: int, total: int) -> None:
+        if done % 50 == 0 or done == total:
+            print(f"  {done}/{total} entries, {time.time() - t0:.0f}s")
+
+    print(f"Building interpretation library ({COUNT} entries) -> {args.out}")
+    done, total = build_library(args.out, generate, workers=args.workers, on_progress=report)
+    if done < total:
+        print(f"⚠️ {total - done} entries failed; run again to resume.")
+    else:
+        print(f"✅ Done in {time.time() - t0:.0f}s. Set INTERPRETATION_LIBRARY={args.out} to serve it.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import os
+import json
+import time
+import argparse
+from collections import deque
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import swisseph as swe
+from dotenv import load_dotenv
+
+from app.core.batch import default_workers, get_pool
+from app.core.geocoder import to_julday_utc_batch
+from app.core.stats import PopulationStats, stats_for
+from app.services.bulk import iter_records, resolve_birth_record
+
+load_dotenv()
+
+Chunk = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def iter_chunks(path: str, fmt: str, size: int, skipped: List[int]) -> Iterator[Chunk]:
+    """逐批讀取出生資料並換算成 (jd_ut, lat, lon) 陣列，一次只保留一批紀錄。"""
+    batch = []
+
+    def flush() -> Chunk:
+        jds = to_julday_utc_batch([inp for inp, _ in batch], [geo.tz for _, geo in batch])
+        lat = np.array([geo.lat for _, geo in batch])
+        lon = np.array([geo.lon for _, geo in batch])
+        batch.clear()
+        return jds, lat, lon
+
+    with open(path, "rb") as f:
+        for rec in iter_records(f, fmt):
+            try:
+                batch.append(resolve_birth_record(rec))
+            except Exception:
+                skipped[0] += 1
+                continue
+            if len(batch) >= size:
+                yield flush()
+    if batch:
+        yield flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大量出生資料的元素 / 黃道狀態統計（分批串流，記憶體固定）")
+    parser.add_argument("input", help="CSV 或 NDJSON，欄位同 /api/chart/bulk（建議提供 lat / lon / tz）")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default=None, help="預設依副檔名判斷")
+    parser.add_argument("--out", default="./stats.json")
+    parser.add_argument("--chunk", type=int, default=50000, help="每批筆數")
+    parser.add_argument("--workers", type=int, default=0, help="行程數，預設同 BATCH_WORKERS")
+    args = parser.parse_args()
+
+    if os.getenv("SWEPH_PATH"):
+        swe.set_ephe_path(os.getenv("SWEPH_PATH"))
+
+    fmt = args.format or ("ndjson" if args.input.endswith((".ndjson", ".jsonl")) else "csv")
+    workers = args.workers or default_workers()
+    total = PopulationStats()
+    skipped = [0]
+    t0 = time.time()
+    chunks = iter_chunks(args.input, fmt, args.chunk, skipped)
+
+    if workers <= 1:
+        for jds, lat, lon in chunks:
+            total.merge(stats_for(jds, lat, lon))
+            print(f"  {total.count} charts, {time.time() - t0:.1f}s")
+    else:
+        # 最多 2 × workers 批在途，讀檔不會超前計算太多
+        pool = get_pool(workers)
+        pending = deque()
+        for jds, lat, lon in chunks:
+            pending.append(pool.submit(stats_for, jds, lat, lon))
+            if len(pending) >= 2 * workers:
+                total.merge(pending.popleft().result())
+                print(f"  {total.count} charts, {time.time() - t0:.1f}s")
+        while pending:
+            total.merge(pending.popleft().result())
+        print(f"  {total.count} charts, {time.time() - t0:.1f}s")
+
+    result = total.to_dict()
+    result["skipped"] = skipped[0]
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"✅ {total.count} charts ({skipped[0]} skipped) in {time.time() - t0:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
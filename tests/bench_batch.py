@@ -0,0 +1,61 @@
+"""
+批次星盤計算的吞吐量測試：以不同的工作行程數計算同一批隨機星盤。
+
+    uv run python tests/bench_batch.py --n 20000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.batch import calc_charts_batch, get_pool, shutdown_pool  # noqa: E402
+
+
+def random_tasks(n: int, seed: int = 42):
+    rng = random.Random(seed)
+    hsys = [b"W", b"P", b"K", b"E"]
+    return [
+        (
+            2415020.5 + rng.random() * 73000.0,  # 1900–2100
+            rng.uniform(-60.0, 60.0),
+            rng.uniform(-180.0, 180.0),
+            rng.choice(hsys),
+        )
+        for _ in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=20000, help="星盤數量")
+    parser.add_argument("--workers", type=str, default="", help="以逗號分隔，例如 1,2,4,8")
+    args = parser.parse_args()
+
+    cpu = os.cpu_count() or 1
+    if args.workers:
+        counts = [int(w) for w in args.workers.split(",")]
+    else:
+        counts = sorted({1, 2, 4, 8, 16, cpu} & set(range(1, cpu + 1)))
+
+    tasks = random_tasks(args.n)
+    print(f"charts={args.n} cpu_count={cpu}")
+    print(f"{'workers':>8} {'seconds':>9} {'charts/s':>10} {'speedup':>8}")
+
+    baseline = None
+    for w in counts:
+        if w > 1:
+            get_pool(w).submit(int).result()  # 先暖機，不計入行程啟動時間
+        t0 = time.perf_counter()
+        calc_charts_batch(tasks, workers=w, compact=True)
+        dt = time.perf_counter() - t0
+        rate = args.n / dt
+        baseline = baseline or rate
+        print(f"{w:>8} {dt:>9.3f} {rate:>10.0f} {rate / baseline:>7.2f}x")
+    shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
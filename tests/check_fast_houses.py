@@ -0,0 +1,75 @@
+"""
+驗證整宮制 / 等宮制的解析快速路徑與 Swiss Ephemeris（swe.houses + 宮首分宮）結果一致。
+
+    uv run python tests/check_fast_houses.py --n 200000
+"""
+import os
+import sys
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.astrology import calc_chart  # noqa: E402
+
+ANGLE_TOL = 1e-8     # 度
+BOUNDARY_TOL = 1e-7  # 距宮首 / 星座邊界小於此值的點不比較宮位與星座
+
+
+def angle_diff(a: float, b: float) -> float:
+    return abs((a - b + 180.0) % 360.0 - 180.0)
+
+
+def near_boundary(x: float, cusps) -> bool:
+    return any(angle_diff(x, c) < BOUNDARY_TOL for c in cusps) or \
+        angle_diff(x, round(x / 30.0) * 30.0) < BOUNDARY_TOL
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failures = 0
+    skipped_points = 0
+    for _ in range(args.n):
+        jd = 2415020.5 + rng.random() * 73000.0   # 1900–2100
+        lat = rng.uniform(-89.9, 89.9)
+        lon = rng.uniform(-180.0, 180.0)
+        hsys = rng.choice([b"W", b"E"])
+
+        fast = calc_chart(jd, lat, lon, hsys, fast=True)
+        ref = calc_chart(jd, lat, lon, hsys, fast=False)
+
+        errs = []
+        for k in ("asc", "mc", "north_node"):
+            if angle_diff(fast[k], ref[k]) > ANGLE_TOL:
+                errs.append(f"{k}: {fast[k]} != {ref[k]}")
+        for i, (a, b) in enumerate(zip(fast["cusps"], ref["cusps"])):
+            if angle_diff(a, b) > ANGLE_TOL:
+                errs.append(f"cusp {i + 1}: {a} != {b}")
+
+        points = dict(ref["planet_lons"], 北交點=ref["north_node"], 南交點=ref["south_node"], 天頂=ref["mc"])
+        for name, x in points.items():
+            if near_boundary(x, ref["cusps"]):
+                skipped_points += 1
+                continue
+            if fast["planet_houses"][name] != ref["planet_houses"][name]:
+                errs.append(f"{name} house: {fast['planet_houses'][name]} != {ref['planet_houses'][name]}")
+        for k in ("asc_sign", "mc_sign"):
+            if fast[k] != ref[k] and not near_boundary(ref[k[:-len("_sign")]], []):
+                errs.append(f"{k}: {fast[k]} != {ref[k]}")
+
+        if errs:
+            failures += 1
+            if failures <= 10:
+                print(f"MISMATCH jd={jd} lat={lat} lon={lon} hsys={hsys!r}: " + "; ".join(errs))
+
+    print(f"charts={args.n} failures={failures} boundary_points_skipped={skipped_points}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()